@@ -0,0 +1,97 @@
+"""
+Compare the time and peak memory of exporting the recipient history to
+CSV by loading the queryset (the previous path) and with the streaming
+export of `mimo_sms.exports`.
+
+Runs on a temporary SQLite database, or on the database of the settings
+module in DJANGO_SETTINGS_MODULE (for example to use server-side cursors
+on PostgreSQL).
+
+    python benchmarks/bench_export.py [--recipients 200000]
+"""
+import argparse
+import csv
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+if 'DJANGO_SETTINGS_MODULE' not in os.environ:
+    settings.configure(
+        INSTALLED_APPS=['mimo_sms'],
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(tempfile.mkdtemp(), 'bench.sqlite3'),
+        }},
+        DEFAULT_AUTO_FIELD='django.db.models.BigAutoField',
+        USE_TZ=True,
+        MIMO_API_TOKEN='', MIMO_API_HOST='',
+    )
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+
+from mimo_sms.exports import RECIPIENT_COLUMNS, iter_csv  # noqa: E402
+from mimo_sms.models import Message, Recipient  # noqa: E402
+from mimo_sms.persistence import persist_recipients  # noqa: E402
+
+
+def previous_path(out, chunk_size):
+    writer = csv.writer(out)
+    writer.writerow([name for name, _, _ in RECIPIENT_COLUMNS])
+    for recipient in list(Recipient.objects.select_related(
+            'message__sender').order_by('pk')):
+        writer.writerow([
+            recipient.pk, recipient.message_id,
+            recipient.message.sender and recipient.message.sender.sender,
+            recipient.phone, recipient.messageId, recipient.status,
+            recipient.create_at, recipient.sent_at, recipient.delivered_at])
+
+
+def streaming_path(out, chunk_size):
+    for part in iter_csv(
+            Recipient.objects.all(), RECIPIENT_COLUMNS, chunk_size):
+        out.write(part)
+
+
+def measure(function, chunk_size: int):
+    gc.collect()
+    with open(os.devnull, 'w', newline='') as out:
+        tracemalloc.start()
+        start = time.perf_counter()
+        function(out, chunk_size)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipients', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    if not Recipient.objects.exists():
+        persist_recipients(Message.objects.create(text='Benchmark'), (
+            {'phone': f'9{i:08d}', 'messageId': f'ABA-{i}', 'status': 'P'}
+            for i in range(args.recipients)))
+    print(f'{Recipient.objects.count()} recipients, '
+          f'chunk size {args.chunk_size}')
+    print(f"{'path':<10} {'time (s)':>10} {'peak (MiB)':>12}")
+    for name, function in (('previous', previous_path),
+                           ('streaming', streaming_path)):
+        seconds, peak = measure(function, args.chunk_size)
+        print(f'{name:<10} {seconds:>10.2f} {peak / 1024 / 1024:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare decode time and peak memory of the available JSON codecs
+on listing payloads shaped like `message/list-all` responses.
+
+    python benchmarks/bench_json_codec.py [--messages 20000] [--repeat 5]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mimo_sms.codec import CODECS, JSONCodec  # noqa: E402
+
+
+def build_payload(messages: int, recipients: int) -> dict:
+    content = []
+    for i in range(messages):
+        content.append({
+            'id': i,
+            'sender': 'LIVING',
+            'text': f'Your verification code is {i:06d}. Do not share it.',
+            'size': 1,
+            'unicode': False,
+            'created_at': '2022-06-25T00:16:00.000Z',
+            'recipients': [
+                {'phone': f'9{i % 100000000:08d}',
+                 'messageId': f'ABA-{i}-{r}',
+                 'status': 'D'}
+                for r in range(recipients)
+            ],
+        })
+    return {'content': content, 'total': messages}
+
+
+def measure(codec, body: bytes, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        codec.loads(body)
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    data = codec.loads(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--recipients', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    body = JSONCodec().dumps(build_payload(args.messages, args.recipients))
+    print(f'payload: {len(body) / 1024 / 1024:.1f} MiB')
+    print(f"{'codec':<8} {'decode (ms)':>12} {'peak (MiB)':>12}")
+    for name, codec_class in CODECS.items():
+        if codec_class is None:
+            print(f'{name:<8} {"not installed":>25}')
+            continue
+        seconds, peak = measure(codec_class(), body, args.repeat)
+        print(f'{name:<8} {seconds * 1000:>12.1f} {peak / 1024 / 1024:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
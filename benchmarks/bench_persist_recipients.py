@@ -0,0 +1,95 @@
+"""
+Compare the time and peak memory of storing the recipients of a large
+send response with the previous path (one list of model objects and a
+single bulk_create) and with `persist_recipients`.
+
+Runs on a temporary SQLite database, or on the database of the settings
+module in DJANGO_SETTINGS_MODULE (for example to measure COPY on
+PostgreSQL).
+
+    python benchmarks/bench_persist_recipients.py [--recipients 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+if 'DJANGO_SETTINGS_MODULE' not in os.environ:
+    settings.configure(
+        INSTALLED_APPS=['mimo_sms'],
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(tempfile.mkdtemp(), 'bench.sqlite3'),
+        }},
+        DEFAULT_AUTO_FIELD='django.db.models.BigAutoField',
+        USE_TZ=True,
+        MIMO_API_TOKEN='', MIMO_API_HOST='',
+    )
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import transaction  # noqa: E402
+
+from mimo_sms.models import Message, Recipient  # noqa: E402
+from mimo_sms.persistence import persist_recipients  # noqa: E402
+
+
+def build_items(recipients: int) -> list:
+    return [
+        {'phone': f'9{i:08d}', 'messageId': f'ABA-{i}', 'status': 'P'}
+        for i in range(recipients)
+    ]
+
+
+def previous_path(message_obj, items, batch_size):
+    list_items = []
+    for item in items:
+        item.update(message=message_obj)
+        list_items.append(Recipient(**item))
+    Recipient.objects.bulk_create(list_items)
+
+
+def streaming_path(message_obj, items, batch_size):
+    persist_recipients(message_obj, items, batch_size)
+
+
+def measure(function, recipients: int, batch_size: int):
+    items = build_items(recipients)
+    message_obj = Message.objects.create(text='Benchmark')
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with transaction.atomic():
+        function(message_obj, items, batch_size)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    Recipient.objects.filter(message=message_obj).delete()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipients', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    print(f'{args.recipients} recipients, batch size {args.batch_size}')
+    print(f"{'path':<10} {'time (s)':>10} {'peak (MiB)':>12}")
+    for name, function in (('previous', previous_path),
+                           ('streaming', streaming_path)):
+        seconds, peak = measure(function, args.recipients, args.batch_size)
+        print(f'{name:<10} {seconds:>10.2f} {peak / 1024 / 1024:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -82,6 +82,12 @@ DATABASES = {
     }
 }
 
+# Read-only mimo_sms traffic (admin listings, reports, exports) goes to
+# the DATABASES aliases in MIMO_DB_REPLICAS, when there are any.
+DATABASE_ROUTERS = ['mimo_sms.routers.ReplicaRouter']
+
+MIMO_DB_REPLICAS = []
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
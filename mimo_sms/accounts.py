@@ -0,0 +1,113 @@
+import itertools
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+
+from mimo_sms.api import (
+    MimoError,
+    MimoMessage,
+    MimoOutOfCredit,
+    MimoThrottled,
+    get_accounts,
+)
+from mimo_sms.models import Recipient
+
+
+class AccountRouter:
+    """
+    Spread sends across the configured MIMO accounts.
+
+    Strategies:
+        round_robin: accounts take turns.
+        least_loaded: the account with fewer sends in flight.
+        sender: the same sender always goes to the same account.
+
+    An account that is throttled or out of credit is skipped until its
+    cool down ends, and the send fails over to the next account.
+    """
+
+    STRATEGIES = ('round_robin', 'least_loaded', 'sender')
+
+    def __init__(self, accounts: list = None, strategy: str = None,
+                 throttle_cooldown: int = None,
+                 credit_cooldown: int = None) -> None:
+        self.accounts = list(accounts or get_accounts())
+        self.strategy = strategy or getattr(
+            settings, 'MIMO_ROUTING', 'round_robin')
+        if self.strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown routing strategy '{self.strategy}'.")
+        self.throttle_cooldown = throttle_cooldown or getattr(
+            settings, 'MIMO_THROTTLE_COOLDOWN', 60)
+        self.credit_cooldown = credit_cooldown or getattr(
+            settings, 'MIMO_CREDIT_COOLDOWN', 600)
+        self._clients = {}
+        self._turn = itertools.count()
+        self._in_flight = Counter()
+        self._cooldown = {}
+        self._lock = threading.Lock()
+
+    def client(self, account: str) -> MimoMessage:
+        if account not in self._clients:
+            self._clients[account] = MimoMessage(account)
+        return self._clients[account]
+
+    def candidates(self, sender: str = None) -> list:
+        """Accounts to try, preferred first."""
+        with self._lock:
+            if self.strategy == 'least_loaded':
+                ordered = sorted(
+                    self.accounts, key=lambda name: self._in_flight[name])
+            else:
+                if self.strategy == 'sender' and sender:
+                    start = zlib.crc32(sender.encode('utf-8'))
+                else:
+                    start = next(self._turn)
+                start %= len(self.accounts)
+                ordered = self.accounts[start:] + self.accounts[:start]
+            now = time.monotonic()
+            available = [
+                name for name in ordered
+                if self._cooldown.get(name, 0) <= now]
+            cooling = sorted(
+                (name for name in ordered if name not in available),
+                key=lambda name: self._cooldown[name])
+        return available + cooling
+
+    def cool_down(self, account: str, error: MimoError):
+        if isinstance(error, MimoOutOfCredit):
+            seconds = self.credit_cooldown
+        else:
+            retry_after = getattr(error.response, 'headers', {}).get(
+                'Retry-After', '')
+            seconds = (
+                int(retry_after) if retry_after.isdigit()
+                else self.throttle_cooldown)
+        with self._lock:
+            self._cooldown[account] = time.monotonic() + seconds
+
+    def send(self, sender: str, recipients: list, text) -> tuple:
+        """
+        Send the message through one of the accounts.
+
+        Return the name of the account used and the MIMO response. Raise
+        ValueError, before sending, when a phone cannot be stored.
+        """
+        Recipient.check_phones(recipients)
+        error = None
+        for account in self.candidates(sender):
+            with self._lock:
+                self._in_flight[account] += 1
+            try:
+                res = self.client(account).send(sender, recipients, text)
+            except (MimoThrottled, MimoOutOfCredit) as e:
+                self.cool_down(account, e)
+                error = e
+                continue
+            finally:
+                with self._lock:
+                    self._in_flight[account] -= 1
+            return account, res
+        raise error
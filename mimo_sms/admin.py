@@ -1,25 +1,92 @@
 from django.contrib import admin, messages
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from mimo_sms.api import MimoSender
+from mimo_sms import tasks
+from mimo_sms.exports import EXPORTS, FORMATS, iter_export
+from mimo_sms.routers import replica_reads
 
-from .forms import CreditForm
+from .forms import BulkCreditForm, CreditForm
 from .models import (
     Recipient,
     Activity,
     Message,
     Sender,
+    CreditDailyRollup,
+    DeliveryLatency,
+    SenderDailyRollup,
+    Campaign,
+    Task,
 )
 
 
+def message_task(model_admin, request, task_obj, title):
+    url = reverse('admin:mimo_sms_task_change', args=[task_obj.pk])
+    model_admin.message_user(
+        request,
+        format_html(
+            '{} queued as <a href="{}">task #{}</a>.',
+            title, url, task_obj.pk),
+        messages.INFO)
+
+
+class ReplicaChangeListMixin:
+    """Read the changelist from a replica. Actions stay on the primary."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method not in ('GET', 'HEAD'):
+            return super().changelist_view(request, extra_context)
+        with replica_reads():
+            response = super().changelist_view(request, extra_context)
+            # Run the queries of the template inside the block.
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+
+class ExportActionsMixin:
+    """Actions streaming the selected rows to a CSV or Parquet file."""
+
+    actions = ('export_csv', 'export_parquet')
+    export_kind = None
+
+    def export(self, request, queryset, file_format):
+        _, columns = EXPORTS[self.export_kind]
+        try:
+            parts = iter_export(queryset, columns, file_format)
+        except ValueError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return None
+        response = StreamingHttpResponse(
+            parts, content_type=FORMATS[file_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.export_kind}.{file_format}"')
+        return response
+
+    @admin.action(description='Export selected to CSV')
+    def export_csv(self, request, queryset):
+        return self.export(request, queryset, 'csv')
+
+    @admin.action(description='Export selected to Parquet')
+    def export_parquet(self, request, queryset):
+        return self.export(request, queryset, 'parquet')
+
+
 class RecipentInline(admin.StackedInline):
     model = Recipient
     fields = ('phone',)
+    readonly_fields = ('phone',)
     min_num = 1
     max_num = 20
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(
+        ExportActionsMixin, ReplicaChangeListMixin, admin.ModelAdmin):
+    export_kind = 'messages'
     autocomplete_fields = ('sender',)
     fieldsets = (
         ('Sender MIMO', {'fields': ('sender',)}),
@@ -27,11 +94,13 @@ class MessageAdmin(admin.ModelAdmin):
     )
     list_display = (
         'id', 'sender', 'view_message_id',
-        'text', 'unicode', 'size')
-    list_filter = ('unicode',)
+        'text', 'unicode', 'size', 'total_count',
+        'pending_count', 'sent_count', 'delivered_count')
+    list_filter = ('unicode', 'account')
+    list_select_related = ('sender', 'body')
     list_per_page = 25
     list_display_links = ('sender', 'text')
-    search_fields = ('sender', 'message_id')
+    search_fields = ('sender__sender', 'message_id', 'body__text')
     inlines = (RecipentInline,)
     ordering = ('-create_at',)
 
@@ -57,12 +126,21 @@ class MessageAdmin(admin.ModelAdmin):
 
 
 @admin.register(Recipient)
-class RecipientAdmin(admin.ModelAdmin):
+class RecipientAdmin(
+        ExportActionsMixin, ReplicaChangeListMixin, admin.ModelAdmin):
+    export_kind = 'recipients'
     autocomplete_fields = ('message',)
-    list_display = ('phone', 'messageId', 'status')
+    list_display = (
+        'phone', 'messageId', 'view_status', 'create_at', 'delivered_at')
+    list_filter = ('state',)
     list_select_related = ('message',)
     list_per_page = 25
-    readonly_fields = ('message', 'phone', 'messageId', 'status')
+    readonly_fields = (
+        'message', 'phone', 'messageId', 'view_status',
+        'create_at', 'sent_at', 'delivered_at')
+
+    def view_status(self, recipient):
+        return recipient.get_status_display()
 
     def has_add_permission(self, request) -> bool:
         return False
@@ -73,6 +151,8 @@ class RecipientAdmin(admin.ModelAdmin):
     def has_delete_permission(self, *args) -> bool:
         return False
 
+    view_status.short_description = 'status'
+
 
 @admin.register(Sender)
 class SenderAdmin(admin.ModelAdmin):
@@ -90,27 +170,15 @@ class SenderAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change) -> None:
         sender = form.cleaned_data.get('sender')
         reason = form.cleaned_data.get('reason')
-        sender_obj = MimoSender()
-        sender_obj.create(sender=sender, reason=reason)
-        return super().save_model(request, obj, form, change)
+        super().save_model(request, obj, form, change)
+        task_obj = tasks.submit('sender.create', sender=sender, reason=reason)
+        message_task(self, request, task_obj, 'Sender request')
 
     @admin.action(description='Check sender availability')
     def check_senders(self, request, queryset):
-        sender_obj = MimoSender()
-        res = sender_obj.list()
-        senders = res.get('content')
-        senders_enable = []
-        for sender in senders:
-            if sender['status'] == "enable":
-                senders_enable.append(sender.get('sender'))
-        queryset_1 = queryset.filter(sender__in=senders_enable)
-        if queryset_1:
-            updated = queryset_1.update(status=Sender.Status.ENABLE)
-            self.message_user(
-                request, "All senders have been verified", updated, messages.SUCCESS)
-        else:
-            self.message_user(
-                request, "Unable to check sender availability", level=messages.ERROR)
+        ids = list(queryset.values_list('pk', flat=True))
+        task_obj = tasks.submit('sender.check', ids=ids)
+        message_task(self, request, task_obj, 'Sender check')
 
     def has_delete_permission(self, *args) -> bool:
         return False
@@ -128,6 +196,42 @@ class ActivityAdmin(admin.ModelAdmin):
     list_display = (
         'serial_number', 'voucher', 'view_type',
         'credits', 'view_price', 'status')
+    change_list_template = 'admin/mimo_sms/activity/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path(
+                'bulk-upload/',
+                self.admin_site.admin_view(self.bulk_upload_view),
+                name='mimo_sms_activity_bulk_upload'),
+        ]
+        return urls + super().get_urls()
+
+    def bulk_upload_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:mimo_sms_activity_changelist')
+        form = BulkCreditForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            task_obj = tasks.submit(
+                'credit.charge_bulk', vouchers=form.cleaned_data['vouchers'])
+            message_task(self, request, task_obj, 'Voucher redemption')
+            return redirect('admin:mimo_sms_activity_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Upload vouchers',
+            'form': form,
+        }
+        return TemplateResponse(
+            request, 'admin/mimo_sms/activity/bulk_upload.html', context)
+
+    def save_form(self, request, form, change):
+        return form.save_pending()
+
+    def save_model(self, request, obj, form, change) -> None:
+        # save_form already saved the pending activity.
+        task_obj = tasks.submit('credit.charge', activity=obj.pk)
+        message_task(self, request, task_obj, 'Voucher redemption')
 
     def has_change_permission(self, *args) -> bool:
         return False
@@ -140,3 +244,82 @@ class ActivityAdmin(admin.ModelAdmin):
 
     view_price.short_description = 'price'
     view_type.short_description = 'Type'
+
+
+class RollupAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    date_hierarchy = 'day'
+    list_per_page = 50
+    ordering = ('-day',)
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, *args) -> bool:
+        return False
+
+    def has_delete_permission(self, *args) -> bool:
+        return False
+
+
+@admin.register(SenderDailyRollup)
+class SenderDailyRollupAdmin(RollupAdmin):
+    list_display = ('day', 'sender', 'messages', 'recipients', 'segments')
+    list_filter = ('sender',)
+    list_select_related = ('sender',)
+
+
+@admin.register(CreditDailyRollup)
+class CreditDailyRollupAdmin(RollupAdmin):
+    list_display = (
+        'day', 'vouchers', 'invalid_vouchers', 'credits', 'price')
+
+
+@admin.register(DeliveryLatency)
+class DeliveryLatencyAdmin(RollupAdmin):
+    list_display = ('day', 'sender', 'count', 'p50', 'p95', 'p99')
+    list_filter = ('sender',)
+    list_select_related = ('sender',)
+    exclude = ('buckets',)
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    autocomplete_fields = ('sender',)
+    fields = ('title', 'sender', 'text', 'groups', 'chunk_size', 'throttle')
+    list_display = (
+        'title', 'sender', 'status', 'total', 'sent', 'failed',
+        'view_progress', 'view_throughput', 'checkpoint_at')
+    list_filter = ('status',)
+    list_select_related = ('sender',)
+    search_fields = ('title',)
+
+    def view_progress(self, campaign):
+        return f"{campaign.progress}%"
+
+    def view_throughput(self, campaign):
+        return f"{campaign.throughput}/s"
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        if obj is not None and obj.status != Campaign.Status.PENDING:
+            return False
+        return super().has_change_permission(request, obj)
+
+    view_progress.short_description = 'Progress'
+    view_throughput.short_description = 'Throughput'
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'kind', 'status', 'create_at', 'started_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = (
+        'kind', 'status', 'payload', 'result', 'error', 'worker',
+        'create_at', 'started_at', 'heartbeat_at', 'finished_at')
+    ordering = ('-create_at',)
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, *args) -> bool:
+        return False
@@ -1,7 +1,69 @@
+import hashlib
 import os
+import threading
+import uuid
 import requests
 
 from django.conf import settings
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+
+from mimo_sms.codec import get_codec
+
+DEFAULT_ACCOUNT = 'default'
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Cache misses being fetched, so concurrent misses share one call.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class MimoError(Exception):
+    """Error returned by the MIMO service."""
+
+    def __init__(self, message: str, response=None) -> None:
+        super().__init__(message)
+        self.response = response
+
+
+class MimoThrottled(MimoError):
+    """The account hit the MIMO rate limit."""
+
+
+class MimoOutOfCredit(MimoError):
+    """The account has no credit left to send messages."""
+
+
+def get_accounts() -> dict:
+    """Return the MIMO accounts configured, by name."""
+    accounts = getattr(settings, 'MIMO_ACCOUNTS', None)
+    if accounts:
+        return accounts
+    return {DEFAULT_ACCOUNT: {}}
+
+
+def get_session(account: str) -> requests.Session:
+    """Return the session, and its connection pool, of an account."""
+    with _sessions_lock:
+        if account not in _sessions:
+            session = requests.Session()
+            pool_size = getattr(settings, 'MIMO_POOL_SIZE', 10)
+            adapter = HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[account] = session
+        return _sessions[account]
+
+
+class _Call:
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
 
 
 class Mimo:
@@ -9,8 +71,19 @@ class Mimo:
     Basic communication with the MIMO service.
     """
 
-    def __init__(self) -> None:
-        if 'MIMO_API_TOKEN' and 'MIMO_API_HOST' in os.environ.keys():
+    # Resources with a namespace cache their reads when MIMO_CACHE is
+    # set, and their writes invalidate the namespace.
+    cache_namespace = None
+
+    def __init__(self, account: str = None) -> None:
+        self.account = account or DEFAULT_ACCOUNT
+        config = getattr(settings, 'MIMO_ACCOUNTS', {}).get(self.account)
+        if config is not None:
+            self.__TOKEN = config['TOKEN']
+            self.__HOST = config['HOST']
+        elif self.account != DEFAULT_ACCOUNT:
+            raise KeyError(f"MIMO account '{self.account}' is not configured.")
+        elif 'MIMO_API_TOKEN' and 'MIMO_API_HOST' in os.environ.keys():
             self.__TOKEN = os.environ['MIMO_API_TOKEN']
             self.__HOST = os.environ['MIMO_API_HOST']
         else:
@@ -19,11 +92,12 @@ class Mimo:
                 self.__HOST = settings.MIMO_API_HOST
             except AttributeError as e:
                 raise e
+        self.codec = get_codec(getattr(settings, 'MIMO_JSON_CODEC', None))
+        self.session = get_session(self.account)
 
     def logout(self):
         url = self._make_url('user/logout')
-        res = requests.get(url)
-        return res.json()
+        return self._get(url)
 
     def _get_hostname(self):
         return self.__HOST
@@ -40,51 +114,142 @@ class Mimo:
     def _join(self, *elements):
         return ','.join(*elements)
 
+    def _send(self, method: str, url: str, payload=None, **kwargs):
+        """Perform the HTTP request, encoding `payload` with the codec."""
+        if payload is not None:
+            kwargs['data'] = self.codec.dumps(payload)
+            kwargs['headers'] = {'Content-Type': 'application/json'}
+        return self.session.request(method, url, **kwargs)
+
+    def _decode(self, res):
+        """Decode the body of a MIMO response with the codec."""
+        return self.codec.loads(res.content)
+
+    def _get(self, url: str, **kwargs):
+        return self._decode(self._send('GET', url, **kwargs))
+
+    def _post(self, url: str, payload=None, **kwargs):
+        return self._decode(self._send('POST', url, payload, **kwargs))
+
+    def _cache_config(self):
+        config = getattr(settings, 'MIMO_CACHE', None)
+        if not config or self.cache_namespace is None:
+            return None
+        return config
+
+    def _cache_prefix(self, cache) -> str:
+        """Prefix of the keys of the namespace, changed on invalidation."""
+        key = f'mimo:{self.account}:{self.cache_namespace}:generation'
+        generation = cache.get_or_set(key, lambda: uuid.uuid4().hex, None)
+        return f'mimo:{self.account}:{self.cache_namespace}:{generation}'
+
+    def _cached_get(self, name: str, url: str, **kwargs):
+        """
+        GET `url` through the cache, with the TTL configured for
+        `namespace.name`, `namespace` or the default timeout. Only
+        successful responses are cached.
+        """
+        config = self._cache_config()
+        if config is None:
+            return self._get(url, **kwargs)
+        cache = caches[config.get('ALIAS', 'default')]
+        ttls = config.get('TTLS', {})
+        timeout = ttls.get(
+            f'{self.cache_namespace}.{name}',
+            ttls.get(self.cache_namespace, config.get('TIMEOUT', 300)))
+        params = sorted((kwargs.get('params') or {}).items())
+        digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()
+        key = f'{self._cache_prefix(cache)}:{name}:{digest}'
+
+        res = cache.get(key)
+        if res is not None:
+            return res
+        with _inflight_lock:
+            call = _inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _inflight[key] = _Call()
+        if leader:
+            try:
+                # A previous leader may have filled it since the miss.
+                call.result = cache.get(key)
+                if call.result is None:
+                    res = self._send('GET', url, **kwargs)
+                    call.result = self._decode(res)
+                    if 200 <= res.status_code < 300:
+                        cache.set(key, call.result, timeout)
+            except Exception as e:
+                call.error = e
+            finally:
+                with _inflight_lock:
+                    del _inflight[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _invalidate(self):
+        """Drop the cached reads of the namespace."""
+        config = self._cache_config()
+        if config is None:
+            return
+        cache = caches[config.get('ALIAS', 'default')]
+        key = f'mimo:{self.account}:{self.cache_namespace}:generation'
+        cache.set(key, uuid.uuid4().hex, None)
+
 
 class MimoSender(Mimo):
     """Communication with sender resource."""
 
-    def __init__(self):
-        super().__init__()
+    cache_namespace = 'sender'
+
+    def __init__(self, account: str = None):
+        super().__init__(account)
 
     def list(self, requested: bool = False, /):
         """List all senders registred in MIMO."""
         if requested is False:
             url = self._make_url('sender-id/list-all')
+            return self._cached_get('list', url)
         else:
             url = self._make_url('sender-id/list-all/requested')
-        res = requests.get(url)
-        return res.json()
+            return self._cached_get('list_requested', url)
 
     def create(self, **payload):
         """Create a new sender."""
         url = self._make_url('sender-id/request')
-        res = requests.post(url, json=payload)
-        return res.json()
+        res = self._post(url, payload)
+        self._invalidate()
+        return res
 
     def view(self, sender_name: str, make_default: bool = False, /):
         """Retrive all information about sender."""
         if make_default is True:
             url = self._make_url('sender-id/default')
-            res = requests.get(url, params={'sender': sender_name})
+            res = self._get(url, params={'sender': sender_name})
+            self._invalidate()
         else:
             url = self._make_url('sender-id/list-one')
-            res = requests.get(url, params={'sender': sender_name})
-        return res.json()
+            res = self._cached_get(
+                'view', url, params={'sender': sender_name})
+        return res
 
     def delete(self, senders_ids: list = None):
         """Delete an sender."""
         url = self._make_url('sender-id/delete')
         senders = self._join(senders_ids)
-        res = requests.get(url, params={'senders': senders})
-        return res.json()
+        res = self._get(url, params={'senders': senders})
+        self._invalidate()
+        return res
 
 
 class MimoMessage(Mimo):
     """Communication with SMS resource."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, account: str = None):
+        super().__init__(account)
 
     def send(self, sender: str, recipients: list, text) -> int:
         """Send messages for an list of recipients."""
@@ -95,81 +260,109 @@ class MimoMessage(Mimo):
             'recipients': receivers,
             'text': text
         }
-        res = requests.post(url, json=payload)
-        return res.json()
+        res = self._send('POST', url, payload)
+        if res.status_code == 429:
+            raise MimoThrottled('MIMO rate limit reached.', res)
+        if res.status_code == 402:
+            raise MimoOutOfCredit('MIMO account without credit.', res)
+        data = self._decode(res)
+        if self._out_of_credit(data):
+            raise MimoOutOfCredit('MIMO account without credit.', res)
+        return data
+
+    @staticmethod
+    def _out_of_credit(data) -> bool:
+        """
+        Whether a send was refused for lack of credit. MIMO answers such
+        a send with an error instead of the message: its `code` or
+        `status` is one of MIMO_NO_CREDIT_CODES, or its `error` or
+        `message` mentions one of MIMO_NO_CREDIT_MARKERS.
+        """
+        if (not isinstance(data, dict)
+                or 'sender' in data or 'recipients' in data):
+            return False
+        codes = getattr(
+            settings, 'MIMO_NO_CREDIT_CODES',
+            (402, '402', 'NO_CREDIT', 'INSUFFICIENT_CREDIT'))
+        if any(data.get(key) in codes for key in ('code', 'status')):
+            return True
+        markers = getattr(
+            settings, 'MIMO_NO_CREDIT_MARKERS',
+            ('credit', 'crédito', 'credito', 'saldo', 'balance'))
+        error = ' '.join(
+            data[key] for key in ('error', 'message')
+            if isinstance(data.get(key), str)).lower()
+        return any(marker in error for marker in markers)
 
     def all(self):
         """Retrive all messages in MIMO SMS."""
         url = self._make_url('message/list-all')
-        res = requests.get(url)
-        return res.json()
+        return self._get(url)
 
     def list_by_phone(self, phone, /):
         """List messages by phone number."""
         url = self._make_url('message/list-all/by-recipient')
-        res = requests.get(url, params={'phone': phone})
-        return res.json()
+        return self._get(url, params={'phone': phone})
 
     def list_by_date(self, start_date, end_date, /):
         """List messages by date."""
         url = self._make_url('message/list-all/by-date')
         params = {'start-date': start_date, 'end-date': end_date}
-        res = self.get(url, params=params)
-        return res.json()
+        return self._get(url, params=params)
 
     def list_recipients(self):
         """List all recipients of all messages send by one user."""
         url = self._make_url('message/list-all/recipients')
-        res = requests.get(url)
-        return res.json()
+        return self._get(url)
 
     def check_status(self, id: int = None, /):
         """Check the status of message."""
         url = self._make_url('message/list-one')
-        res = requests.get(url, params={'id': id})
-        return res.json()
+        return self._get(url, params={'id': id})
 
     def delete(self, messages_ids: list = None):
         """Delete all messages or basead in IDs."""
         if messages_ids is None:
             url = self._make_url('message/delete/all')
-            res = requests.get(url)
+            res = self._get(url)
         else:
             url = self._make_url('message/delete')
             ids = self._join(messages_ids)
-            res = requests.get(url, params={'ids': ids})
-        return res.json()
+            res = self._get(url, params={'ids': ids})
+        return res
 
 
 class MimoContact(Mimo):
     """Communication with contacts resource."""
 
-    def __init__(self):
-        super().__init__()
+    cache_namespace = 'contact'
+
+    def __init__(self, account: str = None):
+        super().__init__(account)
 
     def list(self):
         """List all contacts registered in MIMO."""
         url = self._make_url('contact/list-all')
-        res = requests.get(url)
-        return res.json()
+        return self._cached_get('list', url)
 
     def create(self, **payload):
         """Create one contact in MIMO."""
         url = self._make_url('contact/add')
-        res = requests.post(url, json=payload)
-        return res.json()
+        res = self._post(url, payload)
+        self._invalidate()
+        return res
 
     def update(self, **payload):
         """Update one contact in MIMO."""
         url = self._make_url('contact/edit')
-        res = requests.post(url, json=payload)
-        return res.json()
+        res = self._post(url, payload)
+        self._invalidate()
+        return res
 
     def view(self, phone_number: str):
         """Retrive one contact basead in phone number."""
         url = self._make_url('contact/list-one')
-        res = requests.get(url, params={'phone': phone_number})
-        return res.json()
+        return self._cached_get('view', url, params={'phone': phone_number})
 
     def delete(self, phones_numbers: list = None):
         """
@@ -178,26 +371,27 @@ class MimoContact(Mimo):
         """
         if phones_numbers is None:
             url = self._make_url('contact/delete/all')
-            res = requests.get(url)
-            return res.json()
+            res = self._get(url)
         else:
             url = self._make_url('contact/delete')
             phones = self._join(phones_numbers)
-            res = requests.get(url, params={'phones': phones})
-            return res.json()
+            res = self._get(url, params={'phones': phones})
+        self._invalidate()
+        return res
 
 
 class MimoGroup(Mimo):
     """Communication with groups resource."""
 
-    def __init__(self):
-        super().__init__()
+    cache_namespace = 'group'
+
+    def __init__(self, account: str = None):
+        super().__init__(account)
 
     def list(self):
         """List all groups in MIMO Service."""
         url = self._make_url('group/list-all')
-        res = requests.get(url)
-        return res.json()
+        return self._cached_get('list', url)
 
     def create(self, name: str, contacts: list = None):
         """Create an group in MIMO."""
@@ -205,23 +399,26 @@ class MimoGroup(Mimo):
         payload = {'name': name}
         if contacts is not None:
             payload.update(contacts=contacts)
-        res = requests.post(url, json=payload)
-        return res.json()
+        res = self._post(url, payload)
+        self._invalidate()
+        return res
 
     def add(self, groups_names: list, phones_numbers: list):
         """Add contacts in groups."""
         url = self._make_url('group/add/contacts')
         groups = self._join(groups_names)
         contacts = self._join(phones_numbers)
-        res = requests.get(url, params={'groups': groups, 'phones': contacts})
-        return res.json()
+        res = self._get(url, params={'groups': groups, 'phones': contacts})
+        self._invalidate()
+        return res
 
     def add_from_excel(self, file_name):
         """Add contacts from excel file."""
         url = self._make_url('group/add/contacts')
         files = {'file': (file_name, open(file_name, 'rb'))}
-        res = requests.post(url, files=files)
-        return res.json()
+        res = self._post(url, files=files)
+        self._invalidate()
+        return res
 
     def update(self, **payload):
         """Update information of group."""
@@ -231,69 +428,71 @@ class MimoGroup(Mimo):
                 'name': payload.get('name'),
                 'new-name': payload.get('new_name')
             }
-            res = requests.get(url, params=params)
+            res = self._get(url, params=params)
         else:
             url = self._make_url('group/edit')
-            res = requests.post(url, json=payload)
-        return res.json()
+            res = self._post(url, payload)
+        self._invalidate()
+        return res
 
     def view(self, name: str):
         """View an expecific group."""
         url = self._make_url('group/list-one')
-        res = requests.get(url, params={'name': name})
-        return res.json()
+        return self._cached_get('view', url, params={'name': name})
 
     def delete(self, groups_names: list = None):
         """Delete all information about an group."""
         if groups_names is None:
             url = self._make_url('group/delete/all')
-            res = requests.get(url)
-            return res.json()
+            res = self._get(url)
         else:
             url = self._make_url('group/delete')
             groups = self._join(groups_names)
-            res = requests.get(url, params={'names': groups})
-            return res.json()
+            res = self._get(url, params={'names': groups})
+        self._invalidate()
+        return res
 
 
 class MimoCampain(Mimo):
     """Communication with campaigns resource."""
 
-    def __init__(self):
-        super().__init__()
+    cache_namespace = 'campain'
+
+    def __init__(self, account: str = None):
+        super().__init__(account)
 
     def list(self):
         """List all campains in MIMO."""
         url = self._make_url('note/list-all')
-        res = requests.get(url)
-        return res.json()
+        return self._cached_get('list', url)
 
     def create(self, **payload):
         """Create an new campain in MIMO."""
         url = self._make_url('note/add')
-        res = requests.post(url, json=payload)
-        return res.json()
+        res = self._post(url, payload)
+        self._invalidate()
+        return res
 
     def update(self, **payload):
         """Update attrs of an campain in MIMO."""
         url = self._make_url('note/edit')
-        res = requests.post(url, json=payload)
-        return res.json()
+        res = self._post(url, payload)
+        self._invalidate()
+        return res
 
     def view(self, title: str):
         """Retrive an specific campain in MIMO."""
         url = self._make_url('note/')
-        res = requests.get(url, params={'title': title})
-        return res.json()
+        return self._cached_get('view', url, params={'title': title})
 
     def delete(self, titles_names: list):
         """Delete all campain or Specific campain by titles."""
         if titles_names is None:
             url = self._make_url('note/delete/all')
-            res = requests.get(url)
-            return res.json()
+            res = self._get(url)
         else:
             url = self._make_url('note/delete')
             titles = self._join(titles_names)
-            res = requests.get(url, params={'titles': titles})
-            return res.json()
+            res = self._get(url, params={'titles': titles})
+        self._invalidate()
+        return res
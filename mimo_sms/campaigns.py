@@ -0,0 +1,138 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from mimo_sms.api import MimoError, MimoGroup
+from mimo_sms.models import Campaign, CampaignRecipient
+from mimo_sms.utils import router, save_message
+
+
+class CampaignBusy(Exception):
+    """The campaign is running elsewhere or already finished."""
+
+
+def _group_phones(name: str, res) -> list:
+    """
+    Phones of the contacts of a MimoGroup.view response. Raise MimoError
+    when MIMO answered with an error or without the contacts.
+    """
+    contacts = None
+    if isinstance(res, dict) and 'error' not in res:
+        contacts = res.get('contacts', res.get('content'))
+    if not isinstance(contacts, list):
+        raise MimoError(f"MIMO group '{name}' could not be read: {res!r}")
+    phones = []
+    for contact in contacts:
+        if isinstance(contact, dict):
+            contact = contact.get('phone')
+        if contact:
+            phones.append(str(contact))
+    return phones
+
+
+def expand_campaign(campaign: Campaign, group_obj: MimoGroup = None):
+    """
+    Store the recipients of the campaign groups, without repeated
+    phones, in the order they will be sent. Nothing is stored when a
+    group cannot be read, so the expansion can be retried.
+    """
+    if campaign.expanded:
+        return
+    group_obj = group_obj or MimoGroup()
+    phones = {}
+    for name in campaign.groups:
+        for phone in _group_phones(name, group_obj.view(name)):
+            phones.setdefault(phone, len(phones))
+    batch_size = getattr(settings, 'MIMO_PERSIST_BATCH_SIZE', 1000)
+    recipients = (
+        CampaignRecipient(campaign=campaign, position=position, phone=phone)
+        for phone, position in phones.items())
+    with transaction.atomic():
+        CampaignRecipient.objects.filter(campaign=campaign).delete()
+        while batch := list(islice(recipients, batch_size)):
+            CampaignRecipient.objects.bulk_create(batch)
+        campaign.expanded = True
+        campaign.total = len(phones)
+        campaign.save(update_fields=['expanded', 'total', 'update_at'])
+
+
+def _claim(campaign: Campaign, force: bool) -> Campaign:
+    statuses = [Campaign.Status.PENDING, Campaign.Status.INTERRUPTED]
+    if force:
+        statuses.append(Campaign.Status.RUNNING)
+    claimed = Campaign.objects.filter(
+        pk=campaign.pk, status__in=statuses).update(
+        status=Campaign.Status.RUNNING, update_at=timezone.now())
+    if not claimed:
+        raise CampaignBusy(
+            f"Campaign '{campaign}' is running or already finished.")
+    campaign.refresh_from_db()
+    if campaign.started_at is None:
+        campaign.started_at = timezone.now()
+        campaign.save(update_fields=['started_at'])
+    return campaign
+
+
+def _checkpoint(campaign: Campaign, chunk: list, message_obj):
+    """Save the result of a chunk and move the cursor past it."""
+    status = (
+        CampaignRecipient.Status.FAILED if message_obj is None
+        else CampaignRecipient.Status.SENT)
+    with transaction.atomic():
+        CampaignRecipient.objects.filter(
+            pk__in=[recipient.pk for recipient in chunk]).update(
+            status=status, message=message_obj)
+        campaign.cursor = chunk[-1].position + 1
+        if message_obj is None:
+            campaign.failed += len(chunk)
+        else:
+            campaign.sent += len(chunk)
+        campaign.checkpoint_at = timezone.now()
+        campaign.save(update_fields=[
+            'cursor', 'sent', 'failed', 'checkpoint_at', 'update_at'])
+
+
+def dispatch_campaign(campaign: Campaign, force: bool = False,
+                      on_progress=None) -> Campaign:
+    """
+    Send the campaign in throttled chunks from its cursor on, saving
+    a checkpoint after every chunk so a new call resumes from there.
+
+    :param force: resume a campaign left running by a crashed process
+    :param on_progress: called with the campaign after every chunk
+    """
+    if campaign.chunk_size < 1 or campaign.throttle < 1:
+        raise ValueError(
+            f"Campaign '{campaign}' needs a chunk size and a throttle "
+            "of at least 1.")
+    campaign = _claim(campaign, force)
+    try:
+        expand_campaign(campaign)
+        sender = campaign.sender.sender
+        while True:
+            chunk = list(
+                CampaignRecipient.objects.filter(
+                    campaign=campaign, position__gte=campaign.cursor)
+                .order_by('position')[:campaign.chunk_size])
+            if not chunk:
+                break
+            start = time.monotonic()
+            phones = [recipient.phone for recipient in chunk]
+            account, res = router.send(sender, phones, campaign.text)
+            _checkpoint(campaign, chunk, save_message(res, account))
+            if on_progress is not None:
+                on_progress(campaign)
+            wait = len(chunk) / campaign.throttle - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
+    except BaseException:
+        campaign.status = Campaign.Status.INTERRUPTED
+        campaign.save(update_fields=['status', 'update_at'])
+        raise
+    campaign.status = Campaign.Status.FINISHED
+    campaign.finished_at = timezone.now()
+    campaign.save(update_fields=['status', 'finished_at', 'update_at'])
+    return campaign
@@ -0,0 +1,68 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class JSONCodec:
+    """Encode and decode JSON with the standard library."""
+
+    name = 'json'
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """Encode and decode JSON with orjson."""
+
+    name = 'orjson'
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """Encode and decode JSON with ujson."""
+
+    name = 'ujson'
+
+    def dumps(self, obj) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+CODECS = {
+    'orjson': OrjsonCodec if orjson is not None else None,
+    'ujson': UjsonCodec if ujson is not None else None,
+    'json': JSONCodec,
+}
+
+
+def get_codec(name: str = None) -> JSONCodec:
+    """
+    Return the codec called `name`, or the fastest one installed.
+    """
+    if name is not None:
+        codec_class = CODECS.get(name)
+        if codec_class is None:
+            raise ValueError(f"JSON codec '{name}' is not available.")
+        return codec_class()
+    for codec_class in CODECS.values():
+        if codec_class is not None:
+            return codec_class()
@@ -0,0 +1,209 @@
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.db import router
+
+from mimo_sms.models import Message, Recipient
+from mimo_sms.routers import replica_reads
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+# Columns of each export: (name, lookup or lookups, type).
+MESSAGE_COLUMNS = (
+    ('id', 'id', 'int'),
+    ('create_at', 'create_at', 'datetime'),
+    ('sender', 'sender__sender', 'str'),
+    ('account', 'account', 'str'),
+    ('message_id', 'message_id', 'int'),
+    ('text', 'body__text', 'str'),
+    ('unicode', 'unicode', 'bool'),
+    ('size', 'size', 'int'),
+    ('total_count', 'total_count', 'int'),
+    ('pending_count', 'pending_count', 'int'),
+    ('sent_count', 'sent_count', 'int'),
+    ('delivered_count', 'delivered_count', 'int'),
+)
+
+RECIPIENT_COLUMNS = (
+    ('id', 'id', 'int'),
+    ('message', 'message_id', 'int'),
+    ('sender', 'message__sender__sender', 'str'),
+    ('phone', ('phone_number', 'phone_digits'), 'phone'),
+    ('message_id', 'messageId', 'str'),
+    ('status', 'state', 'status'),
+    ('create_at', 'create_at', 'datetime'),
+    ('sent_at', 'sent_at', 'datetime'),
+    ('delivered_at', 'delivered_at', 'datetime'),
+)
+
+EXPORTS = {
+    'messages': (Message, MESSAGE_COLUMNS),
+    'recipients': (Recipient, RECIPIENT_COLUMNS),
+}
+
+# Content type of each format.
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def _chunk_size(chunk_size: int = None) -> int:
+    return chunk_size or getattr(settings, 'MIMO_EXPORT_CHUNK_SIZE', 2000)
+
+
+def filter_export(kind: str, start=None, end=None, sender=None,
+                  status=None):
+    """
+    Rows of the `messages` or `recipients` export created from `start`
+    to `end`, of the `sender` and with the recipient `status`. Messages
+    match a status when any of their recipients has it.
+    """
+    model, _ = EXPORTS[kind]
+    prefix = '' if model is Message else 'message__'
+    queryset = model.objects.all()
+    if start is not None:
+        queryset = queryset.filter(create_at__date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(create_at__date__lte=end)
+    if sender is not None:
+        queryset = queryset.filter(**{f'{prefix}sender__sender': sender})
+    if status is not None:
+        status = Recipient.STATE_STATUS[Recipient.to_state(status)]
+        if model is Message:
+            counter = Message.STATUS_COUNTERS[status]
+            queryset = queryset.filter(**{f'{counter}__gt': 0})
+        else:
+            queryset = queryset.with_status(status)
+    return queryset
+
+
+# Columns read from the compact recipient fields, as the model shows them.
+_DECODE = {
+    'status': Recipient.STATE_STATUS.__getitem__,
+    'phone': Recipient.decode_phone,
+}
+
+
+def export_rows(queryset, columns, chunk_size: int = None):
+    """
+    Rows of the queryset, read from a replica when there is one, with a
+    server-side cursor `chunk_size` rows at a time.
+    """
+    chunk_size = _chunk_size(chunk_size)
+    with replica_reads():
+        using = router.db_for_read(queryset.model)
+    lookups = [
+        (lookup,) if isinstance(lookup, str) else lookup
+        for _, lookup, _ in columns]
+    rows = (
+        queryset.using(using).order_by('pk')
+        .values_list(*(name for names in lookups for name in names))
+        .iterator(chunk_size=chunk_size))
+    kinds = [kind for _, _, kind in columns]
+    if not any(kind in _DECODE for kind in kinds):
+        yield from rows
+        return
+    for row in rows:
+        values, start = [], 0
+        for names, kind in zip(lookups, kinds):
+            end = start + len(names)
+            decode = _DECODE.get(kind)
+            values.append(
+                row[start] if decode is None else decode(*row[start:end]))
+            start = end
+        yield tuple(values)
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(queryset, columns, chunk_size: int = None):
+    """The export as CSV text, in parts of `chunk_size` rows."""
+    chunk_size = _chunk_size(chunk_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in columns])
+    rows = export_rows(queryset, columns, chunk_size)
+    while batch := list(islice(rows, chunk_size)):
+        writer.writerows(
+            [_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file handing over what was written since last asked."""
+
+    def __init__(self) -> None:
+        self.parts = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def pop(self) -> bytes:
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_parquet(queryset, columns, chunk_size: int = None):
+    """
+    The export as a zstd compressed Parquet file, in parts of one row
+    group of `chunk_size` rows. Needs pyarrow.
+    """
+    chunk_size = _chunk_size(chunk_size)
+    types = {
+        'int': pyarrow.int64(),
+        'str': pyarrow.string(),
+        'bool': pyarrow.bool_(),
+        'status': pyarrow.string(),
+        'phone': pyarrow.string(),
+        'datetime': pyarrow.timestamp('us', tz='UTC'),
+    }
+    schema = pyarrow.schema(
+        [(name, types[kind]) for name, _, kind in columns])
+    sink = _Sink()
+    rows = export_rows(queryset, columns, chunk_size)
+    with pyarrow.parquet.ParquetWriter(
+            sink, schema, compression='zstd') as writer:
+        while batch := list(islice(rows, chunk_size)):
+            writer.write_batch(pyarrow.record_batch(
+                [pyarrow.array(values, field.type) for values, field
+                 in zip(zip(*batch), schema)], schema=schema))
+            yield sink.pop()
+    yield sink.pop()
+
+
+def iter_export(queryset, columns, file_format: str = 'csv',
+                chunk_size: int = None):
+    """The export in `file_format`, csv or parquet, part by part."""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format '{file_format}'.")
+    if file_format == 'parquet':
+        if pyarrow is None:
+            raise ValueError('Parquet exports need pyarrow installed.')
+        return iter_parquet(queryset, columns, chunk_size)
+    return iter_csv(queryset, columns, chunk_size)
@@ -1,7 +1,7 @@
 from django import forms
 
 from mimo_sms.models.credit import Activity
-from mimo_sms.utils import charge_credits
+from mimo_sms.utils import charge_credits, charge_credits_bulk
 
 
 class CreditForm(forms.ModelForm):
@@ -11,12 +11,11 @@ class CreditForm(forms.ModelForm):
 
     def clean_voucher(self):
         voucher = self.cleaned_data.get('voucher')
-        voucher = Activity.objects.filter(voucher=voucher)
-        if voucher.exists():
-            raise forms.ValidationError("Voucher is already registered.")
         if len(voucher) < 14:
             raise forms.ValidationError(
-                'voucher', 'Voucher must be 14 characters long')
+                'Voucher must be 14 characters long')
+        if Activity.objects.filter(voucher=voucher).exists():
+            raise forms.ValidationError("Voucher is already registered.")
         return voucher
 
     def save(self, commit=True):
@@ -24,3 +23,60 @@ class CreditForm(forms.ModelForm):
         voucher = self.cleaned_data.get('voucher')
         instance = charge_credits(voucher)
         return instance
+
+    def save_pending(self):
+        """Register the voucher to be charged in background."""
+        instance = super().save(commit=False)
+        instance.type = Activity.Types.PENDING
+        instance.save()
+        return instance
+
+
+class BulkCreditForm(forms.Form):
+    vouchers = forms.CharField(
+        widget=forms.Textarea, required=False,
+        help_text='One voucher per line.')
+    file = forms.FileField(
+        required=False,
+        help_text='Text file with one voucher per line.')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        lines = cleaned_data.get('vouchers', '').splitlines()
+        file = cleaned_data.get('file')
+        if file is not None:
+            lines.extend(file.read().decode('utf-8').splitlines())
+        vouchers = [line.strip() for line in lines if line.strip()]
+        if not vouchers:
+            raise forms.ValidationError('Inform at least one voucher.')
+        invalid = [voucher for voucher in vouchers if len(voucher) != 14]
+        if invalid:
+            raise forms.ValidationError(
+                'Vouchers must be 14 characters long: %(vouchers)s',
+                params={'vouchers': ', '.join(invalid)})
+        cleaned_data['vouchers'] = vouchers
+        return cleaned_data
+
+    def save(self):
+        return charge_credits_bulk(self.cleaned_data['vouchers'])
+
+
+class SendJobForm(forms.Form):
+    sender = forms.CharField(max_length=11)
+    text = forms.CharField()
+    recipients = forms.JSONField()
+
+    def clean_recipients(self):
+        recipients = self.cleaned_data.get('recipients')
+        if not isinstance(recipients, list) or not recipients:
+            raise forms.ValidationError(
+                'Recipients must be a non empty list of phone numbers.')
+        phones = [str(phone) for phone in recipients]
+        invalid = [
+            phone for phone in phones
+            if not phone.isdigit() or len(phone) > 9]
+        if invalid:
+            raise forms.ValidationError(
+                'Invalid phone numbers: %(phones)s',
+                params={'phones': ', '.join(invalid)})
+        return phones
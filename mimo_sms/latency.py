@@ -0,0 +1,58 @@
+import math
+from collections import Counter
+
+# Ratio between the bounds of consecutive buckets. Percentiles are
+# reported as the upper bound of their bucket, at most 5% above the
+# latencies recorded.
+GROWTH = 1.05
+
+
+class Histogram:
+    """
+    Latencies in milliseconds counted in logarithmic buckets, in the
+    manner of HDR histograms: fixed relative error, a few hundred
+    buckets from one millisecond to days, and histograms of different
+    senders or days merge by adding their counts.
+    """
+
+    def __init__(self, buckets: dict = None) -> None:
+        self.buckets = Counter(
+            {int(index): count for index, count in (buckets or {}).items()})
+
+    @staticmethod
+    def bucket_of(milliseconds: float) -> int:
+        if milliseconds < 1:
+            return 0
+        return math.floor(math.log(milliseconds, GROWTH)) + 1
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        """Highest latency of the bucket, in milliseconds."""
+        return GROWTH ** index
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def add(self, milliseconds: float, count: int = 1):
+        self.buckets[self.bucket_of(milliseconds)] += count
+
+    def merge(self, other: 'Histogram'):
+        self.buckets.update(other.buckets)
+
+    def percentile(self, percent: float):
+        """Latency in milliseconds under which `percent` of them fall."""
+        total = self.count
+        if not total:
+            return None
+        rank = math.ceil(total * percent / 100) or 1
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return self.upper_bound(index)
+
+    def to_json(self) -> dict:
+        return {
+            str(index): count
+            for index, count in sorted(self.buckets.items()) if count}
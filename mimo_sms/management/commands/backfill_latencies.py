@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from mimo_sms.reports import backfill_latencies
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the delivery latency histograms from the recipients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--estimate', action='store_true',
+            help=('Give delivered recipients without a delivery time the '
+                  'last update of their message first.'))
+
+    def handle(self, *args, **options):
+        histograms = backfill_latencies(estimate=options['estimate'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{histograms} histograms rebuilt.'))
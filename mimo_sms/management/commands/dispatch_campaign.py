@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mimo_sms.api import MimoError
+from mimo_sms.campaigns import CampaignBusy, dispatch_campaign
+from mimo_sms.models import Campaign
+
+
+class Command(BaseCommand):
+    help = 'Send a campaign, resuming from its last checkpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign', type=int, help='ID of the campaign.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Resume a campaign left running by a crashed process.')
+
+    def progress(self, campaign):
+        self.stdout.write(
+            f'{campaign.cursor}/{campaign.total} '
+            f'({campaign.progress}%) sent={campaign.sent} '
+            f'failed={campaign.failed} {campaign.throughput}/s')
+
+    def handle(self, *args, **options):
+        try:
+            campaign = Campaign.objects.select_related('sender').get(
+                pk=options['campaign'])
+        except Campaign.DoesNotExist:
+            raise CommandError('Campaign does not exist.')
+        try:
+            campaign = dispatch_campaign(
+                campaign, force=options['force'], on_progress=self.progress)
+        except (CampaignBusy, MimoError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Campaign '{campaign}' finished."))
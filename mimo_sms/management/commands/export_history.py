@@ -0,0 +1,58 @@
+import gzip
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mimo_sms.exports import EXPORTS, FORMATS, filter_export, iter_export
+from mimo_sms.models import Recipient
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream the message or recipient history to a CSV or Parquet file, '
+        'with constant memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORTS)
+        parser.add_argument(
+            '--output', default='-',
+            help=('File to write, gzip compressed when it ends in .gz. '
+                  'CSV goes to the standard output by default.'))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument(
+            '--start', type=date.fromisoformat,
+            help='First day, as YYYY-MM-DD.')
+        parser.add_argument(
+            '--end', type=date.fromisoformat,
+            help='Last day, as YYYY-MM-DD.')
+        parser.add_argument('--sender', help='Sender name.')
+        parser.add_argument(
+            '--status', type=str.upper,
+            choices=[*Recipient.Status.values, *Recipient.Status.names],
+            help='Recipient status.')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        output, file_format = options['output'], options['format']
+        queryset = filter_export(
+            options['kind'], options['start'], options['end'],
+            options['sender'], options['status'])
+        _, columns = EXPORTS[options['kind']]
+        try:
+            parts = iter_export(
+                queryset, columns, file_format, options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if output == '-':
+            if file_format != 'csv':
+                raise CommandError('Write Parquet exports to an --output.')
+            for part in parts:
+                self.stdout.write(part, ending='')
+            return
+        mode = 'wb' if file_format == 'parquet' else 'wt'
+        opener = gzip.open if output.endswith('.gz') else open
+        kwargs = {} if mode == 'wb' else {'encoding': 'utf-8', 'newline': ''}
+        with opener(output, mode, **kwargs) as file:
+            for part in parts:
+                file.write(part)
+        self.stdout.write(self.style.SUCCESS(f'Exported to {output}.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from mimo_sms.reports import materialize_rollups
+
+
+class Command(BaseCommand):
+    help = 'Materialize the daily rollups touched since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute the rollups of every day.')
+
+    def handle(self, *args, **options):
+        days = materialize_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{days} days materialized.'))
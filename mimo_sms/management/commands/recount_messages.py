@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from mimo_sms.models import Message, Recipient
+
+
+class Command(BaseCommand):
+    help = 'Recompute the recipient counters of messages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of messages recomputed per query.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = ['total_count', *Message.STATUS_COUNTERS.values()]
+        repaired = 0
+        last_pk = 0
+        while True:
+            messages = list(
+                Message.objects.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', *fields)[:batch_size])
+            if not messages:
+                break
+            last_pk = messages[-1].pk
+            rows = (
+                Recipient.objects.filter(message__in=messages).order_by()
+                .values('message_id', 'state').annotate(total=Count('id')))
+            counts = defaultdict(dict)
+            for row in rows:
+                status = Recipient.STATE_STATUS[row['state']]
+                counts[row['message_id']][status] = row['total']
+            changed = []
+            for message_obj in messages:
+                before = [getattr(message_obj, field) for field in fields]
+                message_obj.set_counters(
+                    counts[message_obj.pk], save=False)
+                if before != [getattr(message_obj, field) for field in fields]:
+                    changed.append(message_obj)
+            Message.objects.bulk_update(changed, fields)
+            repaired += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'{repaired} messages repaired.'))
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from mimo_sms.models import Task
+from mimo_sms.tasks import reclaim_stale, run_task
+
+
+def _run(pk: int):
+    try:
+        return run_task(pk)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the queued admin tasks, those of MIMO_TASK_EXECUTOR=dispatcher '
+        'and those a restarted process left queued or running.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of tasks run at the same time.')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to wait when there is no task queued.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                stale = reclaim_stale()
+                if any(stale.values()):
+                    self.stdout.write(
+                        f"{stale['requeued']} stale tasks requeued, "
+                        f"{stale['failed']} failed.")
+                pks = list(
+                    Task.objects.filter(status=Task.Status.QUEUED)
+                    .order_by('pk').values_list('pk', flat=True)[:workers])
+                if not pks:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                ran = sum(executor.map(_run, pks))
+                self.stdout.write(f'{ran} tasks run.')
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='delivered_count',
+            field=models.IntegerField(default=0, verbose_name='Delivered'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='pending_count',
+            field=models.IntegerField(default=0, verbose_name='Pending'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='sent_count',
+            field=models.IntegerField(default=0, verbose_name='Sent'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='total_count',
+            field=models.IntegerField(default=0, verbose_name='Total'),
+        ),
+    ]
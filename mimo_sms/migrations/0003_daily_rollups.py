@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:54
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0002_message_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('vouchers', models.IntegerField(default=0)),
+                ('invalid_vouchers', models.IntegerField(default=0)),
+                ('credits', models.IntegerField(default=0)),
+                ('price', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('update_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'credit daily report',
+                'verbose_name_plural': 'Credit daily reports',
+                'db_table': 'mimo_credit_daily_rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_run', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'mimo_rollup_checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='SenderDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('messages', models.IntegerField(default=0)),
+                ('recipients', models.IntegerField(default=0)),
+                ('segments', models.IntegerField(default=0)),
+                ('update_at', models.DateTimeField(auto_now=True)),
+                ('sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='mimo_sms.sender')),
+            ],
+            options={
+                'verbose_name': 'sender daily report',
+                'verbose_name_plural': 'Sender daily reports',
+                'db_table': 'mimo_sender_daily_rollups',
+                'constraints': [models.UniqueConstraint(fields=('day', 'sender'), name='unique_sender_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0003_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='account',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='MIMO account'),
+        ),
+    ]
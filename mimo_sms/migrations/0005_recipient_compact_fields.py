@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0004_message_account'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipient',
+            name='phone_number',
+            field=models.PositiveIntegerField(db_index=True, null=True, verbose_name='Phone'),
+        ),
+        migrations.AddField(
+            model_name='recipient',
+            name='phone_digits',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipient',
+            name='state',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'SENT'), (2, 'PENDING'), (3, 'DELIVERED')], default=2, verbose_name='Status'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 5000
+
+# Largest value of the phone_number column.
+MAX_PHONE_NUMBER = 2147483647
+
+STATUS_STATE = {'S': 1, 'P': 2, 'D': 3}
+STATE_STATUS = {state: status for status, state in STATUS_STATE.items()}
+
+
+def _batches(Recipient, fields):
+    last_pk = 0
+    while True:
+        batch = list(
+            Recipient.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', *fields)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        yield batch
+
+
+def _encode_phone(phone):
+    """Phone number and digits storing the phone exactly, or None."""
+    if phone == '':
+        return None, 0
+    if not (phone.isascii() and phone.isdigit()):
+        return None
+    number = int(phone)
+    if number > MAX_PHONE_NUMBER:
+        return None
+    digits = len(phone)
+    return number, (None if digits == len(str(number)) else digits)
+
+
+def _check(Recipient):
+    """Refuse to convert when any row would not be stored exactly."""
+    invalid = []
+    for batch in _batches(Recipient, ('phone', 'status')):
+        invalid.extend(
+            (recipient.pk, recipient.phone, recipient.status)
+            for recipient in batch
+            if _encode_phone(recipient.phone) is None
+            or recipient.status not in STATUS_STATE)
+    if invalid:
+        sample = ', '.join(
+            f'{pk} ({phone!r}, {status!r})'
+            for pk, phone, status in invalid[:20])
+        raise ValueError(
+            f'{len(invalid)} recipients have a phone that is not a number '
+            f'up to {MAX_PHONE_NUMBER} or a status other than S, P or D, and '
+            f'cannot be converted without losing data. Fix them and run '
+            f'the migration again. Recipients (phone, status): {sample}')
+
+
+def to_compact(apps, schema_editor):
+    Recipient = apps.get_model('mimo_sms', 'Recipient')
+    _check(Recipient)
+    for batch in _batches(Recipient, ('phone', 'status')):
+        for recipient in batch:
+            recipient.phone_number, recipient.phone_digits = _encode_phone(
+                recipient.phone)
+            recipient.state = STATUS_STATE[recipient.status]
+        with transaction.atomic():
+            Recipient.objects.bulk_update(
+                batch, ['phone_number', 'phone_digits', 'state'])
+
+
+def from_compact(apps, schema_editor):
+    Recipient = apps.get_model('mimo_sms', 'Recipient')
+    fields = ('phone_number', 'phone_digits', 'state')
+    for batch in _batches(Recipient, fields):
+        for recipient in batch:
+            recipient.phone = (
+                '' if recipient.phone_number is None
+                else str(recipient.phone_number).zfill(
+                    recipient.phone_digits or 0))
+            recipient.status = STATE_STATUS[recipient.state]
+        with transaction.atomic():
+            Recipient.objects.bulk_update(batch, ['phone', 'status'])
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own, so large tables are converted
+    # without holding a single long transaction. Every row is checked
+    # before the first one is converted.
+    atomic = False
+
+    dependencies = [
+        ('mimo_sms', '0005_recipient_compact_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_compact, from_compact),
+    ]
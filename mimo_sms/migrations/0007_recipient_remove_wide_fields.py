@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0006_recipient_compact_data'),
+    ]
+
+    operations = [
+        # A default lets the column be added back when unapplying.
+        migrations.AlterField(
+            model_name='recipient',
+            name='phone',
+            field=models.CharField(db_index=True, default='', max_length=9),
+        ),
+        migrations.RemoveField(
+            model_name='recipient',
+            name='phone',
+        ),
+        migrations.RemoveField(
+            model_name='recipient',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='recipient',
+            name='update_at',
+        ),
+    ]
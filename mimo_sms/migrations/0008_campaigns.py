@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0007_recipient_remove_wide_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_at', models.DateTimeField(auto_now_add=True)),
+                ('update_at', models.DateTimeField(auto_now=True)),
+                ('title', models.CharField(max_length=100)),
+                ('text', models.TextField()),
+                ('groups', models.JSONField(default=list, help_text='Names of the MIMO groups to reach.')),
+                ('status', models.CharField(choices=[('1', 'PENDING'), ('2', 'RUNNING'), ('3', 'INTERRUPTED'), ('4', 'FINISHED')], default='1', max_length=1)),
+                ('chunk_size', models.IntegerField(default=100, verbose_name='Recipients per chunk')),
+                ('throttle', models.IntegerField(default=100, verbose_name='Recipients per second')),
+                ('expanded', models.BooleanField(default=False)),
+                ('cursor', models.IntegerField(default=0, help_text='Position of the next recipient to send.')),
+                ('total', models.IntegerField(default=0)),
+                ('sent', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('checkpoint_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='campaigns', to='mimo_sms.sender')),
+            ],
+            options={
+                'db_table': 'mimo_campaigns',
+            },
+        ),
+        migrations.CreateModel(
+            name='CampaignRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField()),
+                ('phone', models.CharField(max_length=9)),
+                ('status', models.CharField(choices=[('P', 'PENDING'), ('S', 'SENT'), ('F', 'FAILED')], default='P', max_length=1)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='mimo_sms.campaign')),
+                ('message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='mimo_sms.message')),
+            ],
+            options={
+                'db_table': 'mimo_campaign_recipients',
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'position'), name='unique_campaign_position')],
+            },
+        ),
+    ]
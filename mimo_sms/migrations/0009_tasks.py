@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0008_campaigns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_at', models.DateTimeField(auto_now_add=True)),
+                ('update_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('1', 'QUEUED'), ('2', 'RUNNING'), ('3', 'DONE'), ('4', 'FAILED')], db_index=True, default='1', max_length=1)),
+                ('payload', models.JSONField(default=dict)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'mimo_tasks',
+            },
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='type',
+            field=models.CharField(choices=[('1', 'ADD'), ('2', 'CREDIT'), ('3', 'DEBIT'), ('4', 'INVALID'), ('5', 'PENDING')], default='1', max_length=1, verbose_name='Type'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0009_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('text', models.TextField()),
+            ],
+            options={
+                'db_table': 'mimo_message_texts',
+            },
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='body',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='messages', to='mimo_sms.messagetext'),
+        ),
+    ]
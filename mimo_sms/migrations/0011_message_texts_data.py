@@ -0,0 +1,64 @@
+import hashlib
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 5000
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _batches(queryset, fields):
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', *fields)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        yield batch
+
+
+def to_texts(apps, schema_editor):
+    Message = apps.get_model('mimo_sms', 'Message')
+    MessageText = apps.get_model('mimo_sms', 'MessageText')
+    for batch in _batches(Message.objects.all(), ('text',)):
+        texts = {_digest(message.text): message.text for message in batch}
+        with transaction.atomic():
+            MessageText.objects.bulk_create(
+                [MessageText(digest=digest, text=text)
+                 for digest, text in texts.items()],
+                ignore_conflicts=True)
+            bodies = dict(
+                MessageText.objects.filter(digest__in=list(texts))
+                .values_list('digest', 'pk'))
+            for message in batch:
+                message.body_id = bodies[_digest(message.text)]
+            Message.objects.bulk_update(batch, ['body'])
+
+
+def from_texts(apps, schema_editor):
+    Message = apps.get_model('mimo_sms', 'Message')
+    messages = Message.objects.select_related('body')
+    for batch in _batches(messages, ('body__text',)):
+        for message in batch:
+            message.text = message.body.text
+        with transaction.atomic():
+            Message.objects.bulk_update(batch, ['text'])
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own, so large tables are converted
+    # without holding a single long transaction.
+    atomic = False
+
+    dependencies = [
+        ('mimo_sms', '0010_message_texts'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_texts, from_texts),
+    ]
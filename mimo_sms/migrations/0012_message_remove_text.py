@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0011_message_texts_data'),
+    ]
+
+    operations = [
+        # A default lets the column be added back when unapplying.
+        migrations.AlterField(
+            model_name='message',
+            name='text',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='text',
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='body',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='messages', to='mimo_sms.messagetext'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0012_message_remove_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipient',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipient',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DeliveryLatency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('count', models.IntegerField(default=0)),
+                ('buckets', models.JSONField(default=dict)),
+                ('p50', models.FloatField(blank=True, null=True, verbose_name='p50 (ms)')),
+                ('p95', models.FloatField(blank=True, null=True, verbose_name='p95 (ms)')),
+                ('p99', models.FloatField(blank=True, null=True, verbose_name='p99 (ms)')),
+                ('update_at', models.DateTimeField(auto_now=True)),
+                ('sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='delivery_latencies', to='mimo_sms.sender')),
+            ],
+            options={
+                'verbose_name': 'delivery latency',
+                'verbose_name_plural': 'Delivery latencies',
+                'db_table': 'mimo_delivery_latencies',
+                'constraints': [models.UniqueConstraint(fields=('day', 'sender'), name='unique_latency_sender_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:24
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def reset_limits(apps, schema_editor):
+    """Campaigns saved with a chunk size or throttle below 1 get the default."""
+    Campaign = apps.get_model('mimo_sms', 'Campaign')
+    for field in ('chunk_size', 'throttle'):
+        Campaign.objects.filter(**{f'{field}__lt': 1}).update(**{field: 100})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0013_delivery_latencies'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_limits, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='campaign',
+            name='chunk_size',
+            field=models.PositiveIntegerField(default=100, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Recipients per chunk'),
+        ),
+        migrations.AlterField(
+            model_name='campaign',
+            name='throttle',
+            field=models.PositiveIntegerField(default=100, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Recipients per second'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0014_campaign_positive_limits'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipient',
+            name='phone_number',
+            field=models.PositiveBigIntegerField(db_index=True, null=True, verbose_name='Phone'),
+        ),
+    ]
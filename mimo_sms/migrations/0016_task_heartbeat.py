@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mimo_sms', '0015_recipient_big_phone_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the running task was seen alive.', null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='worker',
+            field=models.CharField(blank=True, default='', help_text='Process running the task.', max_length=100),
+        ),
+    ]
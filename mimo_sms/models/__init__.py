@@ -1,3 +1,11 @@
-from .message import Message, Recipient
+from .message import Message, MessageText, Recipient
 from .credit import Activity
 from .sender import Sender
+from .report import (
+    CreditDailyRollup,
+    DeliveryLatency,
+    RollupCheckpoint,
+    SenderDailyRollup,
+)
+from .campaign import Campaign, CampaignRecipient
+from .task import Task
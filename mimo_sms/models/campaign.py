@@ -0,0 +1,90 @@
+from django.core.validators import MinValueValidator
+from django.db import models
+
+from .behaviors import TimeStamp
+
+
+class Campaign(TimeStamp):
+
+    class Status(models.TextChoices):
+        PENDING = ('1', 'PENDING')
+        RUNNING = ('2', 'RUNNING')
+        INTERRUPTED = ('3', 'INTERRUPTED')
+        FINISHED = ('4', 'FINISHED')
+
+    title = models.CharField(max_length=100)
+    sender = models.ForeignKey(
+        'mimo_sms.Sender', on_delete=models.PROTECT,
+        related_name='campaigns')
+    text = models.TextField()
+    groups = models.JSONField(
+        default=list, help_text='Names of the MIMO groups to reach.')
+    status = models.CharField(
+        max_length=1, choices=Status.choices, default=Status.PENDING)
+    chunk_size = models.PositiveIntegerField(
+        'Recipients per chunk', default=100,
+        validators=[MinValueValidator(1)])
+    throttle = models.PositiveIntegerField(
+        'Recipients per second', default=100,
+        validators=[MinValueValidator(1)])
+    expanded = models.BooleanField(default=False)
+    cursor = models.IntegerField(
+        default=0, help_text='Position of the next recipient to send.')
+    total = models.IntegerField(default=0)
+    sent = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    checkpoint_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'mimo_campaigns'
+
+    @property
+    def progress(self) -> float:
+        """Percentage of recipients already processed."""
+        if not self.total:
+            return 0.0
+        return round(100 * self.cursor / self.total, 2)
+
+    @property
+    def throughput(self) -> float:
+        """Recipients processed per second since the dispatch started."""
+        if self.started_at is None or self.checkpoint_at is None:
+            return 0.0
+        seconds = (self.checkpoint_at - self.started_at).total_seconds()
+        if seconds <= 0:
+            return 0.0
+        return round(self.cursor / seconds, 2)
+
+    def __str__(self):
+        return self.title
+
+
+class CampaignRecipient(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = ('P', 'PENDING')
+        SENT = ('S', 'SENT')
+        FAILED = ('F', 'FAILED')
+
+    campaign = models.ForeignKey(
+        'Campaign', on_delete=models.CASCADE, related_name='recipients')
+    position = models.IntegerField()
+    phone = models.CharField(max_length=9)
+    message = models.ForeignKey(
+        'mimo_sms.Message', on_delete=models.SET_NULL,
+        null=True, blank=True)
+    status = models.CharField(
+        max_length=1, choices=Status.choices, default=Status.PENDING)
+
+    class Meta:
+        db_table = 'mimo_campaign_recipients'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('campaign', 'position'),
+                name='unique_campaign_position'),
+        ]
+
+    def __str__(self):
+        return self.phone
@@ -13,6 +13,7 @@ class Activity(TimeStamp):
         CREDIT = ('2', 'CREDIT')
         DEBIT = ('3', 'DEBIT')
         INVALID = ('4', 'INVALID')
+        PENDING = ('5', 'PENDING')
 
     user = models.CharField(max_length=50)
     serial_number = models.CharField(max_length=50)
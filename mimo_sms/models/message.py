@@ -1,6 +1,92 @@
-from django.db import models
+import hashlib
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from .behaviors import TimeStamp
+from .report import DeliveryLatency
+
+
+class MessageTextQuerySet(models.QuerySet):
+
+    def for_texts(self, texts) -> dict:
+        """
+        Return the stored body of each text by digest, storing the
+        texts not seen before.
+        """
+        texts = {MessageText.digest_of(text): text for text in texts}
+        bodies = {
+            body.digest: body
+            for body in self.filter(digest__in=list(texts))}
+        missing = [
+            MessageText(digest=digest, text=text)
+            for digest, text in texts.items() if digest not in bodies]
+        if missing:
+            self.bulk_create(missing, ignore_conflicts=True)
+            bodies.update(
+                (body.digest, body) for body in self.filter(
+                    digest__in=[body.digest for body in missing]))
+        return bodies
+
+    def for_text(self, text: str):
+        """Return the stored body of the text, storing it if new."""
+        body, _ = self.get_or_create(
+            digest=MessageText.digest_of(text), defaults={'text': text})
+        return body
+
+
+class MessageText(models.Model):
+    """Body of messages, stored once and addressed by its SHA-256."""
+
+    digest = models.CharField(max_length=64, unique=True)
+    text = models.TextField()
+
+    objects = MessageTextQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'mimo_message_texts'
+
+    @staticmethod
+    def digest_of(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def __str__(self):
+        return self.text
+
+
+class MessageQuerySet(models.QuerySet):
+    """
+    Queries on the deduplicated bodies. Look messages up by text with
+    `with_texts()`, which goes through the digest index, or with
+    `body__text` lookups (also across relations, like
+    `message__body__text`). `update(text=...)` points the messages to
+    the stored body of the text.
+    """
+
+    def with_texts(self, *texts):
+        """Messages with any of the texts."""
+        return self.filter(body__digest__in=[
+            MessageText.digest_of(text) for text in texts])
+
+    def update(self, **kwargs):
+        if 'text' in kwargs:
+            kwargs['body'] = MessageText.objects.using(self.db).for_text(
+                kwargs.pop('text') or '')
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        pending = [obj for obj in objs if obj._text is not None]
+        if pending:
+            bodies = MessageText.objects.using(self.db).for_texts(
+                obj._text for obj in pending)
+            for obj in pending:
+                obj.body = bodies[MessageText.digest_of(obj._text)]
+                obj._text = None
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Message(TimeStamp):
@@ -9,9 +95,28 @@ class Message(TimeStamp):
         related_name='messages', null=True, blank=True)
     message_id = models.IntegerField(
         'ID', null=True, blank=True)
-    text = models.TextField()
+    body = models.ForeignKey(
+        'MessageText', on_delete=models.PROTECT, related_name='messages')
     unicode = models.BooleanField(default=False)
     size = models.IntegerField(default=0)
+    account = models.CharField(
+        'MIMO account', max_length=50, blank=True, default='')
+    total_count = models.IntegerField('Total', default=0)
+    pending_count = models.IntegerField('Pending', default=0)
+    sent_count = models.IntegerField('Sent', default=0)
+    delivered_count = models.IntegerField('Delivered', default=0)
+
+    # Counter field kept for each status of Recipient.
+    STATUS_COUNTERS = {
+        'P': 'pending_count',
+        'S': 'sent_count',
+        'D': 'delivered_count',
+    }
+
+    # Text set but not yet resolved to its stored body.
+    _text = None
+
+    objects = MessageQuerySet.as_manager()
 
     class Meta:
         db_table = 'mimo_message'
@@ -21,26 +126,260 @@ class Message(TimeStamp):
         """ID of MIMO SMS Service."""
         return self.message_id
 
+    @property
+    def text(self):
+        if self._text is not None:
+            return self._text
+        if self.body_id is None:
+            return ''
+        return self.body.text
+
+    @text.setter
+    def text(self, value):
+        self._text = value or ''
+
+    def save(self, *args, **kwargs):
+        if self._text is not None:
+            self.body = MessageText.objects.for_text(self._text)
+            self._text = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'body'}
+        return super().save(*args, **kwargs)
+
+    def set_counters(self, counts: dict, save: bool = True):
+        """Set the counters from a mapping of status to recipients."""
+        self.total_count = sum(counts.values())
+        for status, field in self.STATUS_COUNTERS.items():
+            setattr(self, field, counts.get(status, 0))
+        if save:
+            self.save(update_fields=[
+                'total_count', *self.STATUS_COUNTERS.values(), 'update_at'])
+
+    def recount(self, save: bool = True):
+        """Recompute the counters from the recipients."""
+        rows = (
+            self.recipients.order_by().values('state')
+            .annotate(total=Count('id')))
+        counts = {
+            Recipient.STATE_STATUS[row['state']]: row['total']
+            for row in rows}
+        self.set_counters(counts, save=save)
+
     def __str__(self):
         return self.text
 
 
-class Recipient(TimeStamp):
+class RecipientQuerySet(models.QuerySet):
+    """
+    Queries on the compact columns. Look recipients up with
+    `with_phones()` and `with_status()`, or with `phone_number`,
+    `phone_digits` and `state` (also across relations, like
+    `recipients__state`). Change statuses with `update_status()`.
+    """
+
+    def with_phones(self, phones):
+        """Recipients with any of the phones, as strings."""
+        plain, padded = [], Q()
+        for phone in phones:
+            number, digits = Recipient.encode_phone(phone)
+            if number is not None and digits is None:
+                plain.append(number)
+            else:
+                padded |= Q(phone_number=number, phone_digits=digits)
+        return self.filter(
+            Q(phone_number__in=plain, phone_digits__isnull=True) | padded)
+
+    def with_status(self, *statuses):
+        """Recipients with any of the status codes or labels."""
+        return self.filter(
+            state__in=[Recipient.to_state(status) for status in statuses])
+
+    def update(self, **kwargs):
+        if 'state' in kwargs:
+            raise TypeError(
+                'Change statuses with update_status(), which also moves '
+                'the counters of the messages.')
+        return super().update(**kwargs)
+
+    def update_status(self, status: str) -> int:
+        """
+        Change the status of the recipients, stamp the time they were
+        first sent or delivered, and move the counters of their messages
+        and the delivery latency histograms in the same transaction.
+        """
+        state = Recipient.to_state(status)
+        status = Recipient.STATE_STATUS[state]
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            changed = self.exclude(state=state)
+            message_ids = changed.order_by('message_id').values_list(
+                'message_id', flat=True).distinct()
+            # Lock the messages so concurrent updates move the counters
+            # from the same starting point.
+            list(Message.objects.using(self.db).select_for_update()
+                 .filter(pk__in=list(message_ids)).order_by('pk')
+                 .values_list('pk', flat=True))
+            rows = (
+                changed.order_by().values('message_id', 'state')
+                .annotate(total=Count('id')))
+            deltas = defaultdict(Counter)
+            for row in rows:
+                previous = Recipient.STATE_STATUS[row['state']]
+                deltas[row['message_id']][previous] -= row['total']
+                deltas[row['message_id']][status] += row['total']
+            stamps = {}
+            if status == Recipient.Status.SENT:
+                stamps['sent_at'] = Coalesce('sent_at', Value(now))
+            elif status == Recipient.Status.DELIVERED:
+                stamps['delivered_at'] = Coalesce('delivered_at', Value(now))
+                self._record_latencies(
+                    changed.filter(delivered_at__isnull=True), now)
+            updated = models.QuerySet.update(changed, state=state, **stamps)
+            self._move_counters(deltas)
+        return updated
+
+    def _record_latencies(self, delivered, now):
+        day = timezone.localdate(now)
+        samples = (
+            (day, sender_id, (now - create_at).total_seconds() * 1000)
+            for sender_id, create_at in delivered.order_by().values_list(
+                'message__sender_id', 'create_at').iterator())
+        DeliveryLatency.objects.using(self.db).record(samples)
+
+    def _move_counters(self, deltas: dict):
+        groups = defaultdict(list)
+        for message_id, delta in deltas.items():
+            key = tuple(sorted(
+                (Message.STATUS_COUNTERS[status], total)
+                for status, total in delta.items()
+                if status in Message.STATUS_COUNTERS and total))
+            if key:
+                groups[key].append(message_id)
+        now = timezone.now()
+        for key, message_ids in groups.items():
+            fields = {field: F(field) + total for field, total in key}
+            Message.objects.using(self.db).filter(
+                pk__in=message_ids).update(update_at=now, **fields)
+
+
+class Recipient(models.Model):
+    """
+    Recipient of a message, stored compactly: the phone as an integer,
+    plus its number of digits when it has leading zeros, the status as a
+    small integer, and the times it was submitted, first sent and first
+    delivered. `phone` and `status` keep working as before through
+    properties.
+    """
+
+    # Largest phone number the column holds, 18 digits with any country
+    # code.
+    MAX_PHONE_NUMBER = 9223372036854775807
 
     class Status(models.TextChoices):
         SENT = ('S', 'SENT')
         PENDING = ('P', 'PENDING')
         DELIVERED = ('D', 'DELIVERED')
 
+    class State(models.IntegerChoices):
+        SENT = (1, 'SENT')
+        PENDING = (2, 'PENDING')
+        DELIVERED = (3, 'DELIVERED')
+
+    STATUS_STATE = {
+        Status.SENT: State.SENT,
+        Status.PENDING: State.PENDING,
+        Status.DELIVERED: State.DELIVERED,
+    }
+    STATE_STATUS = {state: status for status, state in STATUS_STATE.items()}
+
     message = models.ForeignKey(
         'Message', on_delete=models.CASCADE, related_name='recipients')
-    phone = models.CharField(max_length=9, db_index=True)
+    phone_number = models.PositiveBigIntegerField(
+        'Phone', null=True, db_index=True)
+    # Digits of the phone when more than those of the number.
+    phone_digits = models.PositiveSmallIntegerField(null=True, blank=True)
     messageId = models.CharField('Message ID', max_length=25)
-    status = models.CharField(
-        max_length=1, choices=Status.choices, default=Status.PENDING)
+    state = models.PositiveSmallIntegerField(
+        'Status', choices=State.choices, default=State.PENDING)
+    create_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    objects = RecipientQuerySet.as_manager()
 
     class Meta:
         db_table = 'mimo_recipients'
 
+    @classmethod
+    def encode_phone(cls, phone) -> tuple:
+        """
+        Phone number and digits that store the phone exactly. Raise
+        ValueError when the phone is not made of digits only.
+        """
+        if phone is None:
+            return None, None
+        phone = str(phone)
+        if phone == '':
+            return None, 0
+        if not (phone.isascii() and phone.isdigit()):
+            raise ValueError(f"Phone '{phone}' is not a number.")
+        number = int(phone)
+        if number > cls.MAX_PHONE_NUMBER:
+            raise ValueError(f"Phone '{phone}' is too long.")
+        digits = len(phone)
+        return number, (None if digits == len(str(number)) else digits)
+
+    @staticmethod
+    def decode_phone(number, digits):
+        """Phone stored as `number` and `digits`."""
+        if number is None:
+            return None if digits is None else ''
+        return str(number).zfill(digits or 0)
+
+    @classmethod
+    def check_phones(cls, phones):
+        """Raise ValueError when any of the phones cannot be stored."""
+        for phone in phones:
+            cls.encode_phone(phone)
+
+    @classmethod
+    def to_state(cls, status, default: int = None) -> int:
+        """
+        State of a status code or label. Raise ValueError for an unknown
+        status, unless there is a `default`.
+        """
+        if status in cls.STATE_STATUS:
+            return status
+        label = str(status).upper()
+        if label in cls.Status.values:
+            return cls.STATUS_STATE[label]
+        if label in cls.Status.names:
+            return cls.STATUS_STATE[cls.Status[label]]
+        if default is None:
+            raise ValueError(f"Unknown recipient status '{status}'.")
+        return default
+
+    @property
+    def phone(self):
+        return self.decode_phone(self.phone_number, self.phone_digits)
+
+    @phone.setter
+    def phone(self, value):
+        self.phone_number, self.phone_digits = self.encode_phone(value)
+
+    @property
+    def status(self):
+        return self.STATE_STATUS[self.state]
+
+    @status.setter
+    def status(self, value):
+        # Statuses MIMO reports but does not define, like `Sending...`,
+        # are pending.
+        self.state = self.to_state(value, default=self.State.PENDING)
+
+    def get_status_display(self):
+        return self.get_state_display()
+
     def __str__(self):
-        return self.phone
+        return self.phone or ''
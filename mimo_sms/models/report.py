@@ -0,0 +1,123 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction
+
+from mimo_sms.latency import Histogram
+
+
+class SenderDailyRollup(models.Model):
+    day = models.DateField(db_index=True)
+    sender = models.ForeignKey(
+        'mimo_sms.Sender', on_delete=models.CASCADE,
+        related_name='daily_rollups', null=True, blank=True)
+    messages = models.IntegerField(default=0)
+    recipients = models.IntegerField(default=0)
+    segments = models.IntegerField(default=0)
+    update_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'mimo_sender_daily_rollups'
+        verbose_name = 'sender daily report'
+        verbose_name_plural = 'Sender daily reports'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('day', 'sender'), name='unique_sender_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.sender} {self.day}"
+
+
+class CreditDailyRollup(models.Model):
+    day = models.DateField(unique=True)
+    vouchers = models.IntegerField(default=0)
+    invalid_vouchers = models.IntegerField(default=0)
+    credits = models.IntegerField(default=0)
+    price = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    update_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'mimo_credit_daily_rollups'
+        verbose_name = 'credit daily report'
+        verbose_name_plural = 'Credit daily reports'
+
+    def __str__(self):
+        return str(self.day)
+
+
+class DeliveryLatencyQuerySet(models.QuerySet):
+
+    def record(self, samples) -> int:
+        """
+        Add latencies to the histograms of their sender and day.
+
+        :param samples: iterable of (day, sender id, milliseconds)
+        """
+        histograms = defaultdict(Histogram)
+        for day, sender_id, milliseconds in samples:
+            histograms[day, sender_id].add(milliseconds)
+        with transaction.atomic(using=self.db):
+            for (day, sender_id), histogram in histograms.items():
+                latency_obj, _ = self.select_for_update().get_or_create(
+                    day=day, sender_id=sender_id)
+                latency_obj.merge(histogram)
+                latency_obj.save()
+        return len(histograms)
+
+
+class DeliveryLatency(models.Model):
+    """Time from submit to delivery of the recipients of a sender per day."""
+
+    PERCENTILES = (50, 95, 99)
+
+    day = models.DateField(db_index=True)
+    sender = models.ForeignKey(
+        'mimo_sms.Sender', on_delete=models.CASCADE,
+        related_name='delivery_latencies', null=True, blank=True)
+    count = models.IntegerField(default=0)
+    buckets = models.JSONField(default=dict)
+    p50 = models.FloatField('p50 (ms)', null=True, blank=True)
+    p95 = models.FloatField('p95 (ms)', null=True, blank=True)
+    p99 = models.FloatField('p99 (ms)', null=True, blank=True)
+    update_at = models.DateTimeField(auto_now=True)
+
+    objects = DeliveryLatencyQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'mimo_delivery_latencies'
+        verbose_name = 'delivery latency'
+        verbose_name_plural = 'Delivery latencies'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('day', 'sender'), name='unique_latency_sender_day'),
+        ]
+
+    def histogram(self) -> Histogram:
+        return Histogram(self.buckets)
+
+    def set_histogram(self, histogram: Histogram):
+        self.buckets = histogram.to_json()
+        self.count = histogram.count
+        for percent in self.PERCENTILES:
+            setattr(self, f'p{percent}', histogram.percentile(percent))
+
+    def merge(self, histogram: Histogram):
+        merged = self.histogram()
+        merged.merge(histogram)
+        self.set_histogram(merged)
+
+    def __str__(self):
+        return f"{self.sender} {self.day}"
+
+
+class RollupCheckpoint(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_run = models.DateTimeField()
+
+    class Meta:
+        db_table = 'mimo_rollup_checkpoints'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,34 @@
+from django.db import models
+
+from .behaviors import TimeStamp
+
+
+class Task(TimeStamp):
+
+    class Status(models.TextChoices):
+        QUEUED = ('1', 'QUEUED')
+        RUNNING = ('2', 'RUNNING')
+        DONE = ('3', 'DONE')
+        FAILED = ('4', 'FAILED')
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(
+        max_length=1, choices=Status.choices, default=Status.QUEUED,
+        db_index=True)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(
+        max_length=100, blank=True, default='',
+        help_text='Process running the task.')
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text='Last time the running task was seen alive.')
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'mimo_tasks'
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
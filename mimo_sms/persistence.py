@@ -0,0 +1,98 @@
+import io
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from mimo_sms.models import Recipient
+
+COPY_FIELDS = (
+    'message', 'phone_number', 'phone_digits', 'messageId', 'state',
+    'create_at', 'sent_at', 'delivered_at')
+
+# Time stamped on a recipient stored with the status, as update_status()
+# stamps it.
+STATUS_STAMPS = {
+    Recipient.Status.SENT: 'sent_at',
+    Recipient.Status.DELIVERED: 'delivered_at',
+}
+
+
+def _copy_value(value) -> str:
+    """Value in the text format of PostgreSQL COPY."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copy(connection, recipients, batch_size: int):
+    """Load the recipients with COPY, one batch at a time."""
+    opts = Recipient._meta
+    fields = [opts.get_field(name) for name in COPY_FIELDS]
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields)
+    sql = (
+        f'COPY {connection.ops.quote_name(opts.db_table)} '
+        f'({columns}) FROM STDIN')
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        while batch := list(islice(recipients, batch_size)):
+            buffer = io.StringIO()
+            for recipient in batch:
+                recipient.create_at = now
+                buffer.write('\t'.join(
+                    _copy_value(field.get_db_prep_save(
+                        getattr(recipient, field.attname), connection))
+                    for field in fields))
+                buffer.write('\n')
+            if hasattr(cursor, 'copy_expert'):
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+            else:
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+
+def persist_recipients(message_obj, items, batch_size: int = None,
+                       using: str = None) -> Counter:
+    """
+    Store the recipients of a MIMO send response as they are consumed,
+    in batches, inside one transaction. Return the recipients by status.
+
+    PostgreSQL loads the batches with COPY, other databases with
+    bulk_create. Recipients already sent or delivered get their
+    `sent_at` or `delivered_at` stamped, as update_status() does.
+
+    :param message_obj: Message of the recipients
+    :param items: iterable of recipients of the response
+    :param batch_size: recipients written per batch
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'MIMO_PERSIST_BATCH_SIZE', 1000)
+    using = using or router.db_for_write(Recipient)
+    connection = connections[using]
+    counts = Counter()
+
+    now = timezone.now()
+
+    def recipients():
+        for item in items:
+            recipient_obj = Recipient(**{**item, 'message': message_obj})
+            counts[recipient_obj.status] += 1
+            stamp = STATUS_STAMPS.get(recipient_obj.status)
+            if stamp and getattr(recipient_obj, stamp) is None:
+                setattr(recipient_obj, stamp, now)
+            yield recipient_obj
+
+    stream = recipients()
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql':
+            _copy(connection, stream, batch_size)
+        else:
+            while batch := list(islice(stream, batch_size)):
+                Recipient.objects.using(using).bulk_create(batch)
+    return counts
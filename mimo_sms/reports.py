@@ -0,0 +1,183 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from mimo_sms.latency import Histogram
+from mimo_sms.models import (
+    Activity,
+    CreditDailyRollup,
+    DeliveryLatency,
+    Message,
+    Recipient,
+    RollupCheckpoint,
+    SenderDailyRollup,
+)
+from mimo_sms.routers import replica_reads
+
+CHECKPOINT = 'daily_rollups'
+
+
+def _touched_days(queryset, since):
+    if since is not None:
+        queryset = queryset.filter(update_at__gte=since)
+    return set(
+        queryset.annotate(day=TruncDate('create_at'))
+        .order_by().values_list('day', flat=True).distinct())
+
+
+def _sender_rollups(days):
+    rows = (
+        Message.objects.filter(create_at__date__in=days)
+        .annotate(day=TruncDate('create_at'))
+        .order_by().values('day', 'sender')
+        .annotate(
+            total_messages=Count('id'),
+            total_recipients=Sum('total_count'),
+            total_segments=Sum(F('size') * F('total_count'))))
+    return [
+        SenderDailyRollup(
+            day=row['day'],
+            sender_id=row['sender'],
+            messages=row['total_messages'],
+            recipients=row['total_recipients'] or 0,
+            segments=row['total_segments'] or 0)
+        for row in rows
+    ]
+
+
+def _credit_rollups(days):
+    invalid = Q(type=Activity.Types.INVALID)
+    rows = (
+        Activity.objects.filter(create_at__date__in=days)
+        .annotate(day=TruncDate('create_at'))
+        .order_by().values('day')
+        .annotate(
+            total_vouchers=Count('id'),
+            total_invalid=Count('id', filter=invalid),
+            total_credits=Sum('credits', filter=~invalid),
+            total_price=Sum('price', filter=~invalid)))
+    return [
+        CreditDailyRollup(
+            day=row['day'],
+            vouchers=row['total_vouchers'],
+            invalid_vouchers=row['total_invalid'],
+            credits=row['total_credits'] or 0,
+            price=row['total_price'] or 0)
+        for row in rows
+    ]
+
+
+def materialize_rollups(full: bool = False) -> int:
+    """
+    Recompute the daily rollups of the days touched since the last run,
+    or of every day when `full` is true. Return the number of days.
+
+    Rows are looked up from MIMO_ROLLUP_SAFETY_WINDOW seconds (300)
+    before the last run, so rows stamped before it but committed after
+    it are not missed. Recomputing a day again is harmless.
+    """
+    started = timezone.now()
+    checkpoint = RollupCheckpoint.objects.filter(name=CHECKPOINT).first()
+    since = None
+    if not full and checkpoint is not None:
+        since = checkpoint.last_run - timedelta(
+            seconds=getattr(settings, 'MIMO_ROLLUP_SAFETY_WINDOW', 300))
+    sender_days = _touched_days(Message.objects.all(), since)
+    credit_days = _touched_days(Activity.objects.all(), since)
+    with transaction.atomic():
+        if full:
+            SenderDailyRollup.objects.all().delete()
+            CreditDailyRollup.objects.all().delete()
+        if sender_days:
+            SenderDailyRollup.objects.filter(day__in=sender_days).delete()
+            SenderDailyRollup.objects.bulk_create(
+                _sender_rollups(sender_days))
+        if credit_days:
+            CreditDailyRollup.objects.filter(day__in=credit_days).delete()
+            CreditDailyRollup.objects.bulk_create(
+                _credit_rollups(credit_days))
+        RollupCheckpoint.objects.update_or_create(
+            name=CHECKPOINT, defaults={'last_run': started})
+    return len(sender_days | credit_days)
+
+
+@replica_reads()
+def sender_daily_report(start=None, end=None, sender=None):
+    """Messages, recipients and segments per sender per day."""
+    queryset = SenderDailyRollup.objects.all()
+    if start is not None:
+        queryset = queryset.filter(day__gte=start)
+    if end is not None:
+        queryset = queryset.filter(day__lte=end)
+    if sender is not None:
+        queryset = queryset.filter(sender__sender=sender)
+    return list(
+        queryset.order_by('day', 'sender__sender').values(
+            'day', 'sender__sender', 'messages', 'recipients', 'segments'))
+
+
+@replica_reads()
+def credit_daily_report(start=None, end=None):
+    """Vouchers, credits and price per day."""
+    queryset = CreditDailyRollup.objects.all()
+    if start is not None:
+        queryset = queryset.filter(day__gte=start)
+    if end is not None:
+        queryset = queryset.filter(day__lte=end)
+    return list(
+        queryset.order_by('day').values(
+            'day', 'vouchers', 'invalid_vouchers', 'credits', 'price'))
+
+
+@replica_reads()
+def delivery_latency_report(start=None, end=None, sender=None):
+    """Deliveries and p50, p95 and p99 latencies per sender per day."""
+    queryset = DeliveryLatency.objects.all()
+    if start is not None:
+        queryset = queryset.filter(day__gte=start)
+    if end is not None:
+        queryset = queryset.filter(day__lte=end)
+    if sender is not None:
+        queryset = queryset.filter(sender__sender=sender)
+    return list(
+        queryset.order_by('day', 'sender__sender').values(
+            'day', 'sender__sender', 'count', 'p50', 'p95', 'p99'))
+
+
+def backfill_latencies(estimate: bool = False, chunk_size: int = 5000) -> int:
+    """
+    Rebuild the delivery latency histograms from the delivery times of
+    the recipients. Return the number of histograms.
+
+    :param estimate: first give delivered recipients without a delivery
+        time the last update of their message, the latest time their
+        status could have changed
+    """
+    if estimate:
+        Recipient.objects.filter(
+            state=Recipient.State.DELIVERED, delivered_at__isnull=True,
+        ).update(delivered_at=Subquery(
+            Message.objects.filter(pk=OuterRef('message_id'))
+            .values('update_at')[:1]))
+    histograms = defaultdict(Histogram)
+    rows = (
+        Recipient.objects.filter(delivered_at__isnull=False).order_by()
+        .values_list('message__sender_id', 'create_at', 'delivered_at')
+        .iterator(chunk_size=chunk_size))
+    for sender_id, create_at, delivered_at in rows:
+        histograms[timezone.localdate(delivered_at), sender_id].add(
+            (delivered_at - create_at).total_seconds() * 1000)
+    latency_objs = []
+    for (day, sender_id), histogram in histograms.items():
+        latency_obj = DeliveryLatency(day=day, sender_id=sender_id)
+        latency_obj.set_histogram(histogram)
+        latency_objs.append(latency_obj)
+    with transaction.atomic():
+        DeliveryLatency.objects.all().delete()
+        DeliveryLatency.objects.bulk_create(latency_objs, batch_size=1000)
+    return len(latency_objs)
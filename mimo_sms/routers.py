@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+APP_LABEL = 'mimo_sms'
+
+# Whether reads of the current context may go to a replica, and until
+# when they are pinned to the primary after a write.
+_replica_reads = ContextVar('mimo_replica_reads', default=False)
+_pinned_until = ContextVar('mimo_pinned_until', default=0.0)
+
+_lags = {}
+_lags_lock = threading.Lock()
+
+
+@contextmanager
+def replica_reads():
+    """
+    Let the reads of `mimo_sms` models inside the block go to a replica.
+    Works as a decorator too.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _lag_sql(connection):
+    if connection.vendor == 'postgresql':
+        return (
+            'SELECT CASE WHEN pg_last_wal_receive_lsn() = '
+            'pg_last_wal_replay_lsn() THEN 0 ELSE EXTRACT(EPOCH FROM '
+            'now() - pg_last_xact_replay_timestamp()) END')
+    if connection.vendor == 'mysql':
+        return 'SHOW REPLICA STATUS'
+    return None
+
+
+def replica_lag(alias: str):
+    """Seconds the replica is behind the primary, or None when unknown."""
+    connection = connections[alias]
+    sql = _lag_sql(connection)
+    if sql is None:
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description or ()]
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    if connection.vendor == 'mysql':
+        lag = dict(zip(columns, row)).get('Seconds_Behind_Source')
+    else:
+        lag = row[0]
+    return None if lag is None else float(lag)
+
+
+class ReplicaRouter:
+    """
+    Send reads of `mimo_sms` models made inside `replica_reads()` to a
+    replica listed in MIMO_DB_REPLICAS, and everything else to the
+    primary.
+
+    Reads stay on the primary inside a transaction, for
+    MIMO_DB_PIN_SECONDS after a write in the same context, and when
+    every replica lags more than MIMO_DB_MAX_LAG seconds.
+    """
+
+    def __init__(self) -> None:
+        self.primary = getattr(settings, 'MIMO_DB_PRIMARY', DEFAULT_DB_ALIAS)
+        self.replicas = list(getattr(settings, 'MIMO_DB_REPLICAS', []))
+        self.max_lag = getattr(settings, 'MIMO_DB_MAX_LAG', 10)
+        self.pin_seconds = getattr(
+            settings, 'MIMO_DB_PIN_SECONDS', self.max_lag)
+        self.lag_interval = getattr(settings, 'MIMO_DB_LAG_INTERVAL', 5)
+
+    def lag(self, alias: str):
+        """Lag of the replica, checked at most every MIMO_DB_LAG_INTERVAL."""
+        now = time.monotonic()
+        with _lags_lock:
+            checked = _lags.get(alias)
+            if checked is not None and now - checked[0] < self.lag_interval:
+                return checked[1]
+        lag = replica_lag(alias)
+        with _lags_lock:
+            _lags[alias] = (now, lag)
+        return lag
+
+    def healthy_replicas(self) -> list:
+        healthy = []
+        for alias in self.replicas:
+            lag = self.lag(alias)
+            if lag is not None and lag <= self.max_lag:
+                healthy.append(alias)
+        return healthy
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        if not self.replicas or not _replica_reads.get():
+            return self.primary
+        if (connections[self.primary].in_atomic_block
+                or time.monotonic() < _pinned_until.get()):
+            return self.primary
+        healthy = self.healthy_replicas()
+        return random.choice(healthy) if healthy else self.primary
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        if self.replicas:
+            _pinned_until.set(time.monotonic() + self.pin_seconds)
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {self.primary, *self.replicas}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self.replicas:
+            return False
+        return None
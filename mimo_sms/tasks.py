@@ -0,0 +1,187 @@
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from mimo_sms.api import MimoSender
+from mimo_sms.models import Activity, Sender, Task
+from mimo_sms.utils import charge_credits, charge_credits_bulk
+
+_handlers = {}
+# Kinds whose tasks can run again after a worker died mid-run.
+_idempotent = set()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def task(kind: str, idempotent: bool = False):
+    """
+    Register the function that runs the tasks of `kind`. Only
+    `idempotent` tasks are queued again when their worker died.
+    """
+    def register(function):
+        _handlers[kind] = function
+        if idempotent:
+            _idempotent.add(kind)
+        return function
+    return register
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MIMO_TASK_WORKERS', 4),
+                thread_name_prefix='mimo-task')
+        return _executor
+
+
+def _run_in_thread(pk: int):
+    try:
+        run_task(pk)
+    finally:
+        connections.close_all()
+
+
+def submit(kind: str, **payload) -> Task:
+    """
+    Queue a task and return it right away.
+
+    MIMO_TASK_EXECUTOR chooses where it runs:
+        thread: a bounded pool of threads of this process (default).
+        dispatcher: a `run_tasks` worker process.
+        eager: right away, in the caller.
+    """
+    if kind not in _handlers:
+        raise KeyError(f"Unknown task '{kind}'.")
+    task_obj = Task.objects.create(kind=kind, payload=payload)
+    executor = getattr(settings, 'MIMO_TASK_EXECUTOR', 'thread')
+    if executor == 'eager':
+        run_task(task_obj.pk)
+        task_obj.refresh_from_db()
+    elif executor == 'thread':
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run_in_thread, task_obj.pk))
+    return task_obj
+
+
+def _heartbeat_seconds() -> float:
+    return getattr(settings, 'MIMO_TASK_HEARTBEAT', 30)
+
+
+def _beat(pk: int, worker: str, stop: threading.Event):
+    """Stamp the heartbeat of the running task until it finishes."""
+    try:
+        while not stop.wait(_heartbeat_seconds()):
+            Task.objects.filter(
+                pk=pk, status=Task.Status.RUNNING, worker=worker).update(
+                heartbeat_at=timezone.now())
+    finally:
+        connections.close_all()
+
+
+def run_task(pk: int) -> bool:
+    """Run a queued task. Return False when another worker took it."""
+    worker = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    now = timezone.now()
+    claimed = Task.objects.filter(pk=pk, status=Task.Status.QUEUED).update(
+        status=Task.Status.RUNNING, started_at=now, worker=worker,
+        heartbeat_at=now)
+    if not claimed:
+        return False
+    task_obj = Task.objects.get(pk=pk)
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_beat, args=(pk, worker, stop), daemon=True,
+        name=f'mimo-task-heartbeat-{pk}')
+    heartbeat.start()
+    result, error = None, ''
+    try:
+        result = _handlers[task_obj.kind](**task_obj.payload)
+        status = Task.Status.DONE
+    except Exception as e:
+        error = repr(e)
+        status = Task.Status.FAILED
+    finally:
+        stop.set()
+        heartbeat.join()
+    # A task reclaimed meanwhile belongs to its new worker.
+    now = timezone.now()
+    Task.objects.filter(
+        pk=pk, status=Task.Status.RUNNING, worker=worker).update(
+        result=result, error=error, status=status, finished_at=now,
+        update_at=now)
+    return True
+
+
+def reclaim_stale(stale_after: float = None) -> dict:
+    """
+    Reclaim the tasks left RUNNING by a worker that died: those without
+    a heartbeat for MIMO_TASK_STALE_AFTER seconds (five heartbeats by
+    default). Idempotent tasks are queued again; the others are marked
+    FAILED, since running them twice could, for example, redeem the
+    same vouchers twice. Return how many were requeued and failed.
+    """
+    if stale_after is None:
+        stale_after = getattr(
+            settings, 'MIMO_TASK_STALE_AFTER', 5 * _heartbeat_seconds())
+    now = timezone.now()
+    since = now - timedelta(seconds=stale_after)
+    # Tasks started before heartbeats were stamped have none.
+    stale = Task.objects.filter(
+        Q(heartbeat_at__lt=since)
+        | Q(heartbeat_at__isnull=True, started_at__lt=since),
+        status=Task.Status.RUNNING)
+    requeued = stale.filter(kind__in=_idempotent).update(
+        status=Task.Status.QUEUED, started_at=None, worker='',
+        heartbeat_at=None, update_at=now)
+    failed = stale.exclude(kind__in=_idempotent).update(
+        status=Task.Status.FAILED, finished_at=now, update_at=now,
+        error='The worker stopped before the task finished. It was not '
+              'run again because it may have been partly done.')
+    return {'requeued': requeued, 'failed': failed}
+
+
+@task('sender.create')
+def create_sender(sender: str, reason: str):
+    return MimoSender().create(sender=sender, reason=reason)
+
+
+@task('sender.check', idempotent=True)
+def check_senders(ids: list):
+    res = MimoSender().list()
+    senders_enable = [
+        sender.get('sender') for sender in res.get('content')
+        if sender['status'] == "enable"]
+    updated = Sender.objects.filter(
+        pk__in=ids, sender__in=senders_enable).update(
+        status=Sender.Status.ENABLE)
+    return {'updated': updated}
+
+
+@task('credit.charge')
+def charge_activity(activity: int):
+    activity_obj = Activity.objects.get(pk=activity)
+    credit_obj = charge_credits(activity_obj.voucher, activity_obj)
+    return {'type': credit_obj.get_type_display()}
+
+
+@task('credit.charge_bulk')
+def charge_vouchers(vouchers: list):
+    credit_objs = charge_credits_bulk(vouchers)
+    invalid = sum(
+        1 for credit_obj in credit_objs
+        if credit_obj.type == Activity.Types.INVALID)
+    return {
+        'redeemed': len(credit_objs) - invalid,
+        'invalid': invalid,
+        'skipped': len(vouchers) - len(credit_objs),
+    }
@@ -0,0 +1,145 @@
+"""
+Query, MIMO call and wall time budgets of the key operations.
+
+A test fails when an operation needs more than its budget at any of the
+data sizes measured. Raise a budget only when the extra cost is wanted.
+
+Wall time depends on the machine, so it is only checked when the
+MIMO_WALL_TIME_BUDGETS environment variable is set:
+
+    MIMO_WALL_TIME_BUDGETS=1 python manage.py test mimo_sms.test_budgets
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from mimo_sms.models import Message, Recipient, Sender
+from mimo_sms.testing import FakeMimoServer
+from mimo_sms.utils import charge_credits, charge_credits_bulk, send_sms
+
+CHECK_WALL_TIME = bool(os.environ.get('MIMO_WALL_TIME_BUDGETS'))
+
+# operation: {size: (queries, MIMO calls, seconds)}
+BUDGETS = {
+    # Includes storing a message body not seen before.
+    'send_sms': {
+        10: (12, 1, 1.0),
+        100: (12, 1, 1.0),
+        1000: (17, 1, 3.0),
+    },
+    'charge_credits': {
+        1: (1, 1, 1.0),
+    },
+    'charge_credits_bulk': {
+        10: (2, 10, 1.0),
+        100: (3, 100, 2.0),
+    },
+    # Includes queueing and running the background task.
+    'check_senders': {
+        10: (11, 1, 1.0),
+        100: (11, 1, 1.0),
+    },
+    'message_changelist': {
+        10: (6, 0, 1.0),
+        1000: (6, 0, 2.0),
+    },
+    'recipient_changelist': {
+        10: (5, 0, 1.0),
+        1000: (5, 0, 2.0),
+    },
+}
+
+
+@override_settings(MIMO_TASK_EXECUTOR='eager')
+class BudgetTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.mimo = FakeMimoServer().__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mimo.__exit__(None, None, None)
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.sender = Sender.objects.create(
+            sender='LIVING', reason='Test sender reason')
+        self.user = User.objects.create(
+            username='admin', is_staff=True, is_superuser=True)
+
+    @contextmanager
+    def budget(self, operation: str, size: int):
+        queries, calls, seconds = BUDGETS[operation][size]
+        self.mimo.reset()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            yield
+        elapsed = time.perf_counter() - start
+        label = f'{operation} with {size}'
+        self.assertLessEqual(
+            len(captured), queries, f'{label}: queries over budget')
+        self.assertLessEqual(
+            len(self.mimo.calls), calls, f'{label}: MIMO calls over budget')
+        if CHECK_WALL_TIME:
+            self.assertLessEqual(
+                elapsed, seconds, f'{label}: wall time over budget')
+
+    def create_messages(self, size: int):
+        message_obj = Message.objects.create(
+            sender=self.sender, text='My test message')
+        Recipient.objects.bulk_create([
+            Recipient(message=message_obj, phone=f'9{_:08d}')
+            for _ in range(size)])
+        Message.objects.bulk_create([
+            Message(sender=self.sender, text='My test message')
+            for _ in range(size - 1)])
+
+    def test_send_sms(self):
+        for size in BUDGETS['send_sms']:
+            recipients = [f'9{_:08d}' for _ in range(size)]
+            with self.budget('send_sms', size):
+                message_obj = send_sms(
+                    sender='LIVING', text='Hi', recipients=recipients)
+            self.assertEqual(message_obj.total_count, size)
+
+    def test_charge_credits(self):
+        with self.budget('charge_credits', 1):
+            charge_credits('90000000000000')
+
+    def test_charge_credits_bulk(self):
+        for size in BUDGETS['charge_credits_bulk']:
+            vouchers = [f'9{size:03d}{_:010d}' for _ in range(size)]
+            with self.budget('charge_credits_bulk', size):
+                self.assertEqual(len(charge_credits_bulk(vouchers)), size)
+
+    def test_check_senders(self):
+        self.client.force_login(self.user)
+        for size in BUDGETS['check_senders']:
+            Sender.objects.all().delete()
+            senders = Sender.objects.bulk_create([
+                Sender(sender=f'S{_}') for _ in range(size)])
+            self.mimo.senders = [sender.sender for sender in senders]
+            data = {
+                'action': 'check_senders',
+                '_selected_action': [sender.pk for sender in senders]}
+            with self.budget('check_senders', size):
+                self.client.post(
+                    reverse('admin:mimo_sms_sender_changelist'), data)
+
+    def test_changelists(self):
+        self.client.force_login(self.user)
+        for size in BUDGETS['message_changelist']:
+            Message.objects.all().delete()
+            self.create_messages(size)
+            for name in ('message', 'recipient'):
+                url = reverse(f'admin:mimo_sms_{name}_changelist')
+                with self.budget(f'{name}_changelist', size):
+                    self.assertEqual(self.client.get(url).status_code, 200)
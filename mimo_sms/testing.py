@@ -0,0 +1,106 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from mimo_sms.api import Mimo
+
+
+class FakeMimoServer:
+    """
+    Local stand-in for the MIMO service, recording the calls it gets.
+
+    Used as a context manager, it points every Mimo client to itself.
+    """
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.senders = []
+        self._lock = threading.Lock()
+        self._message_id = 0
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._handle(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                server._handle(self, self.rfile.read(length))
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 128
+
+        self.httpd = Server(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self._patch = mock.patch.object(
+            Mimo, '_get_hostname', return_value=self.url)
+        self._patch.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._patch.stop()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+    def _handle(self, handler, body):
+        url = urlparse(handler.path)
+        endpoint = url.path.strip('/')
+        params = {key: value[0] for key, value in parse_qs(url.query).items()}
+        data = json.loads(body) if body else {}
+        with self._lock:
+            self.calls.append(endpoint)
+        route = getattr(self, 'route_' + endpoint.replace('/', '_').replace(
+            '-', '_'), None)
+        status, res = (404, {}) if route is None else route(params, data)
+        content = json.dumps(res).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def route_message_send(self, params, data):
+        recipients = []
+        for phone in data['recipients'].split(','):
+            with self._lock:
+                self._message_id += 1
+                message_id = self._message_id
+            recipients.append({
+                'phone': phone, 'messageId': str(message_id), 'status': 'P'})
+        return 200, {
+            'sender': data['sender'], 'text': data['text'],
+            'size': 1, 'unicode': False, 'recipients': recipients}
+
+    def route_credit_recharge(self, params, data):
+        voucher = params.get('voucher', '')
+        if not voucher.startswith('9'):
+            return 400, {'error': 'Invalid voucher.'}
+        return 201, {
+            'user': 'test', 'serialNumber': voucher[-6:],
+            'voucher': voucher, 'credits_': 100, 'price': '1000.00',
+            'status': '1', 'currentCredits': 100}
+
+    def route_credit(self, params, data):
+        return 200, {'balance': '0'}
+
+    def route_sender_id_list_all(self, params, data):
+        return 200, {'content': [
+            {'sender': sender, 'status': 'enable'}
+            for sender in self.senders]}
+
+    def route_sender_id_request(self, params, data):
+        return 200, data
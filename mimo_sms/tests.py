@@ -1,14 +1,66 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
 
+import requests
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.contrib.auth.models import User
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from mimo_sms.accounts import AccountRouter
+from mimo_sms.api import (
+    MimoContact,
+    MimoError,
+    MimoGroup,
+    MimoMessage,
+    MimoThrottled,
+)
+from mimo_sms.campaigns import dispatch_campaign
+from mimo_sms.codec import JSONCodec, get_codec
+from mimo_sms.exports import pyarrow
 from mimo_sms.models import (
+    Campaign,
+    CampaignRecipient,
     Recipient,
+    RollupCheckpoint,
     Activity,
     Message,
-    Sender
+    MessageText,
+    Sender,
+    Task
+)
+from mimo_sms.models.message import RecipientQuerySet
+from mimo_sms.persistence import _copy_value, persist_recipients
+from mimo_sms import routers, tasks
+from mimo_sms.testing import FakeMimoServer
+from mimo_sms.reports import (
+    credit_daily_report,
+    delivery_latency_report,
+    materialize_rollups,
+    sender_daily_report
 )
 from mimo_sms.utils import (
     charge_credits,
+    charge_credits_bulk,
     view_credits,
+    save_message,
     send_sms
 )
 
@@ -48,6 +100,170 @@ class MessageTestCase(TestCase):
         self.assertEqual(type(result), list)
         self.assertEqual(Recipient.objects.count(), 10)
 
+    def test_compact_recipient_api(self):
+        message_obj = Message.objects.create(
+            sender=self.sender,
+            text="My test message",
+        )
+        Recipient.objects.create(
+            message=message_obj, phone="930499550", status="DELIVERED")
+        Recipient.objects.create(
+            message=message_obj, phone="0930499551", status="Sending...")
+        recipient = Recipient.objects.with_phones(["930499550"]).get()
+        self.assertEqual(recipient.phone_number, 930499550)
+        self.assertEqual(recipient.status, Recipient.Status.DELIVERED)
+        padded = Recipient.objects.with_phones(["0930499551"]).get()
+        self.assertEqual(padded.phone, "0930499551")
+        self.assertEqual(
+            Recipient.objects.with_status(Recipient.Status.PENDING).get(),
+            padded)
+        self.assertFalse(
+            Recipient.objects.with_phones(["930499551"]).exists())
+        self.assertEqual(
+            Message.objects.filter(
+                recipients__state=Recipient.State.DELIVERED).get(),
+            message_obj)
+        with self.assertRaises(ValueError):
+            Recipient(phone="93049955a")
+        with self.assertRaises(ValueError):
+            Recipient.objects.with_status("DELIVERD")
+        with self.assertRaises(TypeError):
+            Recipient.objects.update(state=Recipient.State.SENT)
+        Recipient.objects.create(message=message_obj, phone="244930499552")
+        self.assertEqual(
+            Recipient.objects.with_phones(["244930499552"]).get().phone,
+            "244930499552")
+
+    def test_unstorable_phones_are_not_sent(self):
+        with mock.patch('mimo_sms.api.Mimo._send') as send:
+            with self.assertRaises(ValueError):
+                send_sms(sender='LIVING', text='Hi',
+                         recipients=['930499550', '+244930499551'])
+        send.assert_not_called()
+
+    def test_update_status_moves_counters(self):
+        message_obj = Message.objects.create(
+            sender=self.sender,
+            text="My test message",
+        )
+        Recipient.objects.bulk_create([
+            Recipient(message=message_obj, phone=f"93384389{_}")
+            for _ in range(5)])
+        message_obj.recount()
+        self.assertEqual(message_obj.pending_count, 5)
+        sent = Recipient.objects.with_phones(["933843890", "933843891"])
+        self.assertEqual(sent.update_status(Recipient.Status.SENT), 2)
+        Recipient.objects.with_phones(["933843891"]).update_status(
+            Recipient.Status.DELIVERED)
+        message_obj.refresh_from_db()
+        self.assertEqual(message_obj.total_count, 5)
+        self.assertEqual(message_obj.pending_count, 3)
+        self.assertEqual(message_obj.sent_count, 1)
+        self.assertEqual(message_obj.delivered_count, 1)
+
+    def test_recount_messages_command(self):
+        message_obj = Message.objects.create(
+            sender=self.sender,
+            text="My test message",
+        )
+        Recipient.objects.bulk_create([
+            Recipient(message=message_obj, phone=f"93384389{_}",
+                      status=Recipient.Status.DELIVERED)
+            for _ in range(3)])
+        call_command('recount_messages', stdout=io.StringIO())
+        message_obj.refresh_from_db()
+        self.assertEqual(message_obj.total_count, 3)
+        self.assertEqual(message_obj.delivered_count, 3)
+
+    def test_persist_recipients_in_batches(self):
+        message_obj = Message.objects.create(
+            sender=self.sender,
+            text="My test message",
+        )
+        items = [
+            {'phone': f"93384389{_}", 'messageId': f"ABA-{_}", 'status': 'S'}
+            for _ in range(5)]
+        with mock.patch.object(
+                RecipientQuerySet, 'bulk_create', autospec=True,
+                side_effect=QuerySet.bulk_create) as bulk_create:
+            counts = persist_recipients(message_obj, iter(items), 2)
+        self.assertEqual(bulk_create.call_count, 3)
+        self.assertDictEqual(dict(counts), {Recipient.Status.SENT: 5})
+        self.assertNotIn('message', items[0])
+        self.assertEqual(message_obj.recipients.count(), 5)
+        self.assertFalse(
+            message_obj.recipients.filter(sent_at__isnull=True).exists())
+        self.assertEqual(_copy_value(None), '\\N')
+        self.assertEqual(_copy_value('a\tb'), 'a\\tb')
+
+    def test_persist_recipients_with_copy(self):
+        message_obj = Message.objects.create(
+            sender=self.sender,
+            text="My test message",
+        )
+        items = [
+            {'phone': "0933843890", 'messageId': "ABA-0", 'status': 'D'},
+            {'phone': "933843891", 'messageId': "ABA\t1", 'status': 'P'},
+            {'phone': "933843892", 'messageId': "ABA-2", 'status': 'S'},
+        ]
+        copied = []
+        connection = mock.MagicMock(
+            vendor='postgresql', ops=connections['default'].ops)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.copy_expert.side_effect = (
+            lambda sql, buffer: copied.append((sql, buffer.read())))
+        with mock.patch.dict('mimo_sms.persistence.connections',
+                             {'default': connection}):
+            counts = persist_recipients(message_obj, iter(items), 2)
+        self.assertEqual(counts[Recipient.Status.DELIVERED], 1)
+        self.assertEqual(len(copied), 2)
+        self.assertIn(
+            '"phone_digits", "messageId", "state", "create_at", "sent_at", '
+            '"delivered_at") FROM STDIN', copied[0][0])
+        rows = [
+            line.split('\t')
+            for _, data in copied for line in data.splitlines()]
+        self.assertListEqual(
+            [row[1:5] for row in rows],
+            [['933843890', '10', 'ABA-0', '3'],
+             ['933843891', '\\N', 'ABA\\t1', '2'],
+             ['933843892', '\\N', 'ABA-2', '1']])
+        self.assertListEqual(
+            [(row[6] != '\\N', row[7] != '\\N') for row in rows],
+            [(False, True), (False, False), (True, False)])
+
+    def test_message_bodies_are_stored_once(self):
+        message_obj = Message.objects.create(
+            sender=self.sender, text="Your code is 1234")
+        Message.objects.bulk_create([
+            Message(sender=self.sender, text=text)
+            for text in ("Your code is 1234", "Your code is 5678")])
+        self.assertEqual(MessageText.objects.count(), 2)
+        self.assertEqual(message_obj.body.messages.count(), 2)
+        self.assertEqual(
+            Message.objects.with_texts("Your code is 1234").count(), 2)
+        self.assertEqual(
+            Message.objects.filter(body__text__endswith="5678").get().text,
+            "Your code is 5678")
+        self.assertEqual(Message.objects.get(pk=message_obj.pk).text,
+                         "Your code is 1234")
+        Message.objects.filter(pk=message_obj.pk).update(text="New code")
+        self.assertEqual(Message.objects.get(pk=message_obj.pk).text,
+                         "New code")
+        self.assertEqual(MessageText.objects.count(), 3)
+
+    def test_admin_searches_senders_and_texts(self):
+        other = Sender.objects.create(sender='OTHER')
+        Message.objects.create(sender=self.sender, text="Your code is 1234")
+        Message.objects.create(sender=other, text="Promo of the week")
+        self.client.force_login(User.objects.create(
+            username='admin', is_staff=True, is_superuser=True))
+        url = reverse('admin:mimo_sms_message_changelist')
+        for query, count in (('LIVING', 1), ('promo', 1), ('zzz', 0)):
+            res = self.client.get(url, {'q': query})
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.context['cl'].result_count, count)
+
     def test_send_message_with_no_credit(self):
         text = "Testing something... @josan"
         recipients = ["930499550"]
@@ -65,6 +281,525 @@ class ActivityTestCase(TestCase):
         self.assertEqual(res.id, 1)
         self.assertEqual(res.type, Activity.Types.INVALID)
 
+    def test_charge_credits_bulk(self):
+        Activity.objects.create(voucher="10000000000000")
+        response = mock.Mock(status_code=400)
+        with mock.patch('mimo_sms.utils.mimo_obj._send',
+                        return_value=response) as send:
+            with self.assertNumQueries(2):
+                res = charge_credits_bulk(
+                    ["10000000000000", "20000000000000", "20000000000000",
+                     "30000000000000"])
+        self.assertEqual(send.call_count, 2)
+        self.assertListEqual(
+            [activity.voucher for activity in res],
+            ["20000000000000", "30000000000000"])
+        self.assertEqual(Activity.objects.count(), 3)
+
+    def test_charge_credits_bulk_keeps_redeemed_on_error(self):
+        def send(method, url, params):
+            if params['voucher'] == "20000000000000":
+                raise requests.ConnectionError()
+            return mock.Mock(status_code=201, content=(
+                b'{"user": "test", "serialNumber": "1", "voucher": "%s", '
+                b'"credits_": 100, "price": "1000.00", "currentCredits": 100}'
+                % params['voucher'].encode()))
+
+        with mock.patch('mimo_sms.utils.mimo_obj._send', side_effect=send):
+            res = charge_credits_bulk(["10000000000000", "20000000000000"])
+        self.assertDictEqual(
+            {activity.voucher: activity.type for activity in res},
+            {"10000000000000": Activity.Types.ADD,
+             "20000000000000": Activity.Types.PENDING})
+        self.assertEqual(Activity.objects.count(), 2)
+
     def test_view_credits_balance(self):
         res = view_credits()
         self.assertDictEqual(res, {'balance': '0'})
+
+
+class CodecTestCase(TestCase):
+
+    def test_fallback_to_stdlib(self):
+        self.assertIsInstance(get_codec('json'), JSONCodec)
+        with self.assertRaises(ValueError):
+            get_codec('unknown')
+
+    @override_settings(MIMO_JSON_CODEC='json')
+    def test_codec_encodes_payload_and_decodes_response(self):
+        response = mock.Mock(content=b'{"phone": "930499550"}')
+        with mock.patch('mimo_sms.api.requests.Session.request',
+                        return_value=response) as request:
+            res = MimoContact().create(phone='930499550')
+        self.assertDictEqual(res, {'phone': '930499550'})
+        kwargs = request.call_args.kwargs
+        self.assertEqual(kwargs['data'], b'{"phone":"930499550"}')
+        self.assertEqual(
+            kwargs['headers'], {'Content-Type': 'application/json'})
+
+
+class RollupTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.sender = Sender.objects.create(
+            sender='LIVING',
+            reason='Test sender reason')
+
+    def test_materialize_rollups(self):
+        for size in (1, 2):
+            message_obj = Message.objects.create(
+                sender=self.sender, text="My test message", size=size)
+            message_obj.set_counters({Recipient.Status.SENT: 3})
+        Activity.objects.create(voucher="10000000000000", credits=50)
+        self.assertEqual(materialize_rollups(), 1)
+        report = sender_daily_report(sender='LIVING')
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['messages'], 2)
+        self.assertEqual(report[0]['recipients'], 6)
+        self.assertEqual(report[0]['segments'], 9)
+        self.assertEqual(credit_daily_report()[0]['credits'], 50)
+
+    @override_settings(MIMO_ROLLUP_SAFETY_WINDOW=0)
+    def test_materialize_only_touched_days(self):
+        Message.objects.create(sender=self.sender, text="Yesterday")
+        yesterday = timezone.now() - timedelta(days=1)
+        Message.objects.update(create_at=yesterday)
+        materialize_rollups()
+        Message.objects.create(sender=self.sender, text="Today")
+        self.assertEqual(materialize_rollups(), 1)
+        self.assertEqual(len(sender_daily_report()), 2)
+
+    def test_materialize_rows_committed_after_last_run(self):
+        materialize_rollups()
+        # Stamped before the last run, committed after it.
+        Message.objects.create(sender=self.sender, text="Late")
+        last_run = RollupCheckpoint.objects.get().last_run
+        Message.objects.update(
+            create_at=last_run - timedelta(days=1),
+            update_at=last_run - timedelta(seconds=1))
+        self.assertEqual(materialize_rollups(), 1)
+        self.assertEqual(sender_daily_report()[0]['messages'], 1)
+
+    def test_delivery_latency_percentiles(self):
+        message_obj = Message.objects.create(
+            sender=self.sender, text="My test message")
+        Recipient.objects.bulk_create([
+            Recipient(message=message_obj, phone=f"9338438{_:02d}")
+            for _ in range(100)])
+        now = timezone.now()
+        recipients = list(Recipient.objects.order_by('pk'))
+        for index, recipient in enumerate(recipients):
+            recipient.create_at = now - timedelta(seconds=index + 1)
+        Recipient.objects.bulk_update(recipients, ['create_at'])
+        Recipient.objects.update_status(Recipient.Status.SENT)
+        Recipient.objects.update_status(Recipient.Status.DELIVERED)
+        self.assertFalse(Recipient.objects.filter(
+            Q(sent_at=None) | Q(delivered_at=None)).exists())
+        report = delivery_latency_report(sender='LIVING')
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['count'], 100)
+        for percent, seconds in ((50, 50), (95, 95), (99, 99)):
+            self.assertGreaterEqual(report[0][f'p{percent}'], seconds * 1000)
+            self.assertLess(report[0][f'p{percent}'], seconds * 1050 + 50)
+        call_command('backfill_latencies', stdout=io.StringIO())
+        self.assertEqual(delivery_latency_report(), report)
+
+
+@override_settings(MIMO_SMS_API_KEYS=['secret'], MIMO_BULK_SEND_BATCH_SIZE=2)
+class BulkSendTestCase(TestCase):
+
+    def setUp(self) -> None:
+        Sender.objects.create(sender='LIVING', reason='Test sender reason')
+
+    def post(self, body, key='secret'):
+        return self.client.post(
+            reverse('mimo_sms:bulk_send'), data=body,
+            content_type='application/x-ndjson',
+            HTTP_AUTHORIZATION=f'Bearer {key}')
+
+    def test_requires_api_key(self):
+        res = self.post(b'', key='wrong')
+        self.assertEqual(res.status_code, 401)
+
+    def test_stream_results_per_line(self):
+        body = b"\n".join([
+            b'{"sender": "LIVING", "text": "Hi", "recipients": ["930499550"]}',
+            b'{"sender": "LIVING", "text": "Hi", "recipients": ["abc"]}',
+            b'',
+            b'not json',
+        ])
+
+        def send(sender, recipients, text):
+            return {
+                'sender': sender, 'text': text, 'size': 1, 'unicode': False,
+                'recipients': [
+                    {'phone': phone, 'messageId': f'ID-{phone}'}
+                    for phone in recipients]}
+
+        with mock.patch('mimo_sms.accounts.MimoMessage.send',
+                        side_effect=send) as send_mock:
+            res = self.post(body)
+            lines = b''.join(res.streaming_content).splitlines()
+        results = [get_codec('json').loads(line) for line in lines]
+        self.assertEqual(send_mock.call_count, 1)
+        self.assertEqual(
+            [(result['line'], result['status']) for result in results],
+            [(1, 'sent'), (2, 'invalid'), (4, 'invalid')])
+        message_obj = Message.objects.get(pk=results[0]['message'])
+        self.assertEqual(message_obj.total_count, 1)
+        self.assertEqual(message_obj.sender.name, 'LIVING')
+
+    def test_failed_saves_do_not_cut_the_stream(self):
+        job = b'{"sender": "LIVING", "text": "Hi", "recipients": ["930499550"]}'
+        responses = iter([
+            ['unexpected'],
+            {'sender': 'LIVING', 'text': 'Hi', 'recipients': []},
+            {'sender': 'LIVING', 'text': 'Hi', 'size': 1, 'unicode': False,
+             'recipients': [{'phone': '930499550'}]},
+        ])
+
+        def save(res, account):
+            if not res['recipients']:
+                raise DatabaseError('Connection lost.')
+            return save_message(res, account)
+
+        with mock.patch('mimo_sms.accounts.MimoMessage.send',
+                        side_effect=lambda *args: next(responses)), \
+                mock.patch('mimo_sms.views.save_message', side_effect=save), \
+                self.settings(MIMO_BULK_SEND_WORKERS=1):
+            res = self.post(b"\n".join([job] * 3))
+            lines = b''.join(res.streaming_content).splitlines()
+        results = [get_codec('json').loads(line) for line in lines]
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['failed', 'failed', 'sent'])
+        self.assertIn('Unexpected MIMO response', results[0]['error'])
+        self.assertIn('Connection lost.', results[1]['error'])
+
+
+class ExportTestCase(TestCase):
+
+    def setUp(self) -> None:
+        for name in ('LIVING', 'OTHER'):
+            message_obj = Message.objects.create(
+                sender=Sender.objects.create(sender=name), text="Hello")
+            Recipient.objects.bulk_create([
+                Recipient(message=message_obj, phone=f"93384389{_}")
+                for _ in range(5)])
+        Recipient.objects.with_phones(
+            ["933843890", "933843891"]).update_status('D')
+
+    def test_export_command_streams_filtered_csv(self):
+        out = io.StringIO()
+        call_command(
+            'export_history', 'recipients', '--sender', 'LIVING',
+            '--status', 'delivered', '--chunk-size', '1', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            {row['sender'] for row in rows} | {row['status'] for row in rows},
+            {'LIVING', 'D'})
+        out = io.StringIO()
+        call_command(
+            'export_history', 'messages', '--status', 'D', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_export_command_writes_parquet(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'recipients.parquet')
+        call_command(
+            'export_history', 'recipients', '--format', 'parquet',
+            '--output', path, '--chunk-size', '3', stdout=io.StringIO())
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.num_rows, 10)
+        self.assertEqual(table.column('status').to_pylist().count('D'), 4)
+
+    def test_admin_export_action_streams_csv(self):
+        self.client.force_login(User.objects.create(
+            username='admin', is_staff=True, is_superuser=True))
+        response = self.client.post(
+            reverse('admin:mimo_sms_message_changelist'),
+            {'action': 'export_csv',
+             '_selected_action': Message.objects.values_list('pk', flat=True)})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines()[0].split(',')[:3],
+                         ['id', 'create_at', 'sender'])
+        self.assertEqual(len(content.splitlines()), 3)
+
+
+@override_settings(MIMO_DB_REPLICAS=['replica'], MIMO_DB_MAX_LAG=10)
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self) -> None:
+        self.router = routers.ReplicaRouter()
+        routers._lags.clear()
+        routers._pinned_until.set(0.0)
+        patcher = mock.patch.object(routers, 'replica_lag', return_value=0.0)
+        self.replica_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_replica_reads_go_to_replicas(self):
+        self.assertEqual(self.router.db_for_read(Message), 'default')
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Message), 'replica')
+            self.assertIsNone(self.router.db_for_read(User))
+            self.assertEqual(self.router.db_for_write(Message), 'default')
+            self.assertEqual(self.router.db_for_read(Message), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'mimo_sms'))
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        self.replica_lag.return_value = 30.0
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Message), 'default')
+            self.assertEqual(self.router.db_for_read(Recipient), 'default')
+        self.replica_lag.assert_called_once_with('replica')
+
+
+@override_settings(MIMO_ACCOUNTS={
+    'main': {'TOKEN': 'main', 'HOST': 'http://main/'},
+    'backup': {'TOKEN': 'backup', 'HOST': 'http://backup/'},
+})
+class AccountRouterTestCase(TestCase):
+
+    def test_round_robin(self):
+        router = AccountRouter()
+        self.assertListEqual(router.candidates(), ['main', 'backup'])
+        self.assertListEqual(router.candidates(), ['backup', 'main'])
+
+    def test_sender_affinity(self):
+        router = AccountRouter(strategy='sender')
+        self.assertEqual(
+            router.candidates('LIVING')[0], router.candidates('LIVING')[0])
+
+    def test_failover_when_throttled(self):
+        router = AccountRouter()
+
+        def send(self, sender, recipients, text):
+            if self.account == 'main':
+                raise MimoThrottled('Too many requests.')
+            return {'sender': sender}
+
+        with mock.patch('mimo_sms.accounts.MimoMessage.send', send):
+            self.assertEqual(
+                router.send('LIVING', ['930499550'], 'Hi')[0], 'backup')
+            self.assertEqual(
+                router.send('LIVING', ['930499550'], 'Hi')[0], 'backup')
+        self.assertListEqual(router.candidates(), ['backup', 'main'])
+        self.assertListEqual(router.candidates(), ['backup', 'main'])
+
+    def test_failover_when_out_of_credit(self):
+        router = AccountRouter()
+        no_credit = mock.Mock(
+            status_code=200, content=b'{"error": "Saldo insuficiente"}')
+        sent = mock.Mock(status_code=200, content=b'{"sender": "LIVING"}')
+
+        def send(self, method, url, payload):
+            return no_credit if self.account == 'main' else sent
+
+        with mock.patch('mimo_sms.api.Mimo._send', send):
+            self.assertEqual(
+                router.send('LIVING', ['930499550'], 'Hi')[0], 'backup')
+        self.assertListEqual(router.candidates(), ['backup', 'main'])
+
+    def test_out_of_credit_reads_only_the_error(self):
+        out_of_credit = MimoMessage._out_of_credit
+        self.assertTrue(out_of_credit({'error': 'Saldo insuficiente'}))
+        self.assertTrue(out_of_credit({'code': 'NO_CREDIT', 'error': ''}))
+        self.assertFalse(out_of_credit({'error': 'Invalid sender'}))
+        self.assertFalse(out_of_credit(
+            {'error': 'Invalid sender', 'help': 'See your balance.'}))
+        self.assertFalse(out_of_credit(
+            {'text': 'Your credit expires soon', 'recipients': []}))
+
+    def test_send_sms_without_credit_returns_none(self):
+        no_credit = mock.Mock(
+            status_code=200, content=b'{"message": "Sem credito"}')
+        with mock.patch('mimo_sms.api.Mimo._send', return_value=no_credit):
+            self.assertIsNone(send_sms(
+                sender='LIVING', text='Hi', recipients=['930499550']))
+
+
+@override_settings(MIMO_CACHE={'TTLS': {'group.list': 30}})
+class CacheTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_reads_are_cached_until_a_write(self):
+        group_obj = MimoGroup()
+        response = mock.Mock(status_code=200, content=b'{"content": []}')
+        with mock.patch.object(MimoGroup, '_send',
+                               return_value=response) as send:
+            group_obj.list()
+            group_obj.list()
+            group_obj.view('clients')
+            self.assertEqual(send.call_count, 2)
+            with mock.patch.object(MimoGroup, '_post', return_value={}):
+                group_obj.create('clients')
+            group_obj.list()
+            self.assertEqual(send.call_count, 3)
+        with mock.patch.object(MimoContact, '_send',
+                               return_value=response) as send:
+            MimoContact().list()
+        self.assertEqual(send.call_count, 1)
+
+    def test_errors_are_not_cached(self):
+        error = mock.Mock(status_code=500, content=b'{"error": "Failed"}')
+        with mock.patch.object(MimoGroup, '_send', return_value=error) as send:
+            self.assertDictEqual(MimoGroup().list(), {'error': 'Failed'})
+            MimoGroup().list()
+        self.assertEqual(send.call_count, 2)
+
+    def test_concurrent_misses_make_one_call(self):
+        release = threading.Event()
+
+        def slow_send(*args, **kwargs):
+            release.wait(5)
+            return mock.Mock(status_code=200, content=b'{"content": []}')
+
+        with mock.patch.object(MimoGroup, '_send',
+                               side_effect=slow_send) as send:
+            threads = [
+                threading.Thread(target=MimoGroup().list) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            release.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(send.call_count, 1)
+
+
+class CampaignTestCase(TestCase):
+
+    def setUp(self) -> None:
+        sender = Sender.objects.create(sender='LIVING')
+        self.campaign = Campaign.objects.create(
+            title='Promo', sender=sender, text='Hi',
+            groups=['clients', 'vip'], chunk_size=2, throttle=1000)
+        self.groups = {
+            'clients': {'contacts': [
+                {'phone': '930000001'}, {'phone': '930000002'},
+                {'phone': '930000003'}]},
+            'vip': {'contacts': ['930000003', '930000004', '930000005']},
+        }
+        self.sent = []
+
+    def send(self, sender, recipients, text):
+        if len(self.sent) == 1 and not getattr(self, 'resumed', False):
+            raise MimoThrottled('Too many requests.')
+        self.sent.append(recipients)
+        return 'main', {
+            'sender': sender, 'text': text, 'size': 1, 'unicode': False,
+            'recipients': [{'phone': phone} for phone in recipients]}
+
+    def test_dispatch_resumes_from_checkpoint(self):
+        with mock.patch('mimo_sms.campaigns.MimoGroup.view',
+                        side_effect=self.groups.get), \
+                mock.patch('mimo_sms.campaigns.router.send',
+                           side_effect=self.send):
+            with self.assertRaises(MimoThrottled):
+                dispatch_campaign(self.campaign)
+            self.campaign.refresh_from_db()
+            self.assertEqual(self.campaign.status, Campaign.Status.INTERRUPTED)
+            self.assertEqual(self.campaign.cursor, 2)
+            self.assertEqual(self.campaign.progress, 40.0)
+            self.resumed = True
+            campaign = dispatch_campaign(self.campaign)
+        self.assertEqual(campaign.status, Campaign.Status.FINISHED)
+        self.assertListEqual(self.sent, [
+            ['930000001', '930000002'], ['930000003', '930000004'],
+            ['930000005']])
+        self.assertEqual(campaign.sent, 5)
+        self.assertFalse(CampaignRecipient.objects.filter(
+            status=CampaignRecipient.Status.PENDING).exists())
+
+    def test_dispatch_keeps_unreadable_groups_unexpanded(self):
+        self.groups['vip'] = {'error': 'Group not found.'}
+        with mock.patch('mimo_sms.campaigns.MimoGroup.view',
+                        side_effect=self.groups.get), \
+                mock.patch('mimo_sms.campaigns.router.send',
+                           side_effect=self.send) as send:
+            with self.assertRaises(MimoError):
+                dispatch_campaign(self.campaign)
+        send.assert_not_called()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, Campaign.Status.INTERRUPTED)
+        self.assertFalse(self.campaign.expanded)
+        self.assertFalse(self.campaign.recipients.exists())
+
+    def test_dispatch_needs_positive_limits(self):
+        for field in ('chunk_size', 'throttle'):
+            setattr(self.campaign, field, 0)
+            with self.assertRaises(ValidationError):
+                self.campaign.full_clean()
+            with self.assertRaises(ValueError):
+                dispatch_campaign(self.campaign)
+            setattr(self.campaign, field, 2)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, Campaign.Status.PENDING)
+
+
+class TaskTestCase(TestCase):
+
+    @override_settings(MIMO_TASK_EXECUTOR='eager')
+    def test_admin_charges_voucher_in_background(self):
+        user = User.objects.create(
+            username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        with FakeMimoServer():
+            res = self.client.post(
+                reverse('admin:mimo_sms_activity_add'),
+                {'voucher': '90000000000001'}, follow=True)
+        self.assertContains(res, 'Voucher redemption queued as')
+        activity = Activity.objects.get()
+        self.assertEqual(activity.type, Activity.Types.ADD)
+        self.assertEqual(activity.credits, 100)
+        self.assertEqual(Task.objects.get().status, Task.Status.DONE)
+
+    @override_settings(MIMO_TASK_EXECUTOR='dispatcher')
+    def test_submit_leaves_task_queued(self):
+        task_obj = tasks.submit('sender.create', sender='LIVING', reason='')
+        self.assertEqual(task_obj.status, Task.Status.QUEUED)
+        with self.assertRaises(KeyError):
+            tasks.submit('unknown')
+
+
+@override_settings(MIMO_TASK_EXECUTOR='dispatcher')
+class RunTasksTestCase(TransactionTestCase):
+
+    def test_run_tasks_command(self):
+        sender = Sender.objects.create(sender='LIVING')
+        task_obj = tasks.submit('sender.check', ids=[sender.pk])
+        with FakeMimoServer() as mimo:
+            mimo.senders = ['LIVING']
+            call_command('run_tasks', '--once', stdout=io.StringIO())
+        task_obj.refresh_from_db()
+        self.assertEqual(task_obj.status, Task.Status.DONE)
+        self.assertDictEqual(task_obj.result, {'updated': 1})
+        sender.refresh_from_db()
+        self.assertEqual(sender.status, Sender.Status.ENABLE)
+
+    def test_run_tasks_reclaims_stale_running(self):
+        sender = Sender.objects.create(sender='LIVING')
+        check = tasks.submit('sender.check', ids=[sender.pk])
+        charge = tasks.submit('credit.charge_bulk', vouchers=['1'])
+        alive = tasks.submit('credit.charge_bulk', vouchers=['2'])
+        old = timezone.now() - timedelta(hours=1)
+        Task.objects.filter(pk__in=[check.pk, charge.pk]).update(
+            status=Task.Status.RUNNING, started_at=old, heartbeat_at=old)
+        Task.objects.filter(pk=alive.pk).update(
+            status=Task.Status.RUNNING, started_at=old,
+            heartbeat_at=timezone.now())
+        with FakeMimoServer() as mimo:
+            mimo.senders = ['LIVING']
+            call_command('run_tasks', '--once', stdout=io.StringIO())
+        for task_obj in (check, charge, alive):
+            task_obj.refresh_from_db()
+        self.assertEqual(check.status, Task.Status.DONE)
+        self.assertEqual(charge.status, Task.Status.FAILED)
+        self.assertIn('not run again', charge.error)
+        self.assertEqual(alive.status, Task.Status.RUNNING)
+        self.assertFalse(Activity.objects.exists())
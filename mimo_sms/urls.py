@@ -0,0 +1,9 @@
+from django.urls import path
+
+from mimo_sms import views
+
+app_name = 'mimo_sms'
+
+urlpatterns = [
+    path('messages/bulk-send/', views.bulk_send, name='bulk_send'),
+]
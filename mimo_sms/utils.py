@@ -1,72 +1,141 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
 
 from mimo_sms.models.credit import Activity
-from mimo_sms.api import Mimo, MimoMessage
-from mimo_sms.models.message import Message, Recipient
+from mimo_sms.accounts import AccountRouter
+from mimo_sms.api import Mimo, MimoOutOfCredit, MimoThrottled
+from mimo_sms.models.message import Message
+from mimo_sms.models.sender import Sender
+from mimo_sms.persistence import persist_recipients
 
 mimo_obj = Mimo()
-mimo_sms_obj = MimoMessage()
+router = AccountRouter()
 
 
-def charge_credits(voucher: str):
-    """Charge accounts of user using voucher code."""
+def _redeem_voucher(voucher: str) -> Activity:
+    """Redeem one voucher in MIMO and return the unsaved activity."""
     url = mimo_obj._make_url('credit/recharge')
-    res = requests.get(url, params={'voucher': voucher})
+    res = mimo_obj._send('GET', url, params={'voucher': voucher})
     if res.status_code == 201:
-        data = res.json()
-        credit_obj = Activity.objects.create(
+        data = mimo_obj._decode(res)
+        return Activity(
             user=data.get('user'),
             serial_number=data.get('serialNumber'),
             voucher=data.get('voucher'),
-            credits_=data.get('credits_'),
+            credits=data.get('credits_'),
             price=data.get('price'),
             status=data.get('status'),
-            current_credits=data.get('currentCredits'),
-            expiration_time=data.get('expirationTime')
+            current_credicts=data.get('currentCredits'),
+            expriration_time=data.get('expirationTime')
         )
-        return credit_obj
 
-    credit_obj = Activity.objects.create(
+    return Activity(
         voucher=voucher,
         type=Activity.Types.INVALID
     )
+
+
+def _redeem_voucher_or_pending(voucher: str) -> Activity:
+    """
+    Redeem one voucher, or return a pending activity when the call
+    failed, as MIMO may have redeemed it before the failure.
+    """
+    try:
+        return _redeem_voucher(voucher)
+    except Exception:
+        return Activity(voucher=voucher, type=Activity.Types.PENDING)
+
+
+def charge_credits(voucher: str, activity: Activity = None):
+    """Charge accounts of user using voucher code.
+
+    :param voucher: voucher code
+    :param activity: pending activity of the voucher to fill
+    """
+    credit_obj = _redeem_voucher(voucher)
+    if activity is not None:
+        credit_obj.pk = activity.pk
+        credit_obj.create_at = activity.create_at
+    credit_obj.save()
     return credit_obj
 
 
+def charge_credits_bulk(vouchers: list, max_workers: int = None) -> list:
+    """Charge accounts of user using many voucher codes at once.
+
+    Vouchers already registered are skipped, the others are redeemed
+    concurrently and all activities are inserted in a single query.
+    Vouchers whose redemption failed are recorded as pending.
+
+    :param vouchers: list of voucher codes
+    :param max_workers: number of concurrent redemptions
+    """
+    vouchers = list(dict.fromkeys(vouchers))
+    registered = set(
+        Activity.objects.filter(voucher__in=vouchers)
+        .values_list('voucher', flat=True))
+    vouchers = [voucher for voucher in vouchers if voucher not in registered]
+    if not vouchers:
+        return []
+    if max_workers is None:
+        max_workers = getattr(settings, 'MIMO_VOUCHER_WORKERS', 8)
+    workers = min(max_workers, len(vouchers))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        credit_objs = list(
+            executor.map(_redeem_voucher_or_pending, vouchers))
+    return Activity.objects.bulk_create(credit_objs)
+
+
 def view_credits():
     """View the credit of user."""
     url = mimo_obj._make_url('credit/')
-    res = requests.get(url)
-    return res.json()
+    return mimo_obj._get(url)
 
 
 def transfer_credits(username: str, balance: int):
     """View the credit of user."""
     url = mimo_obj._make_url('credit/transfer')
-    res = requests.get(url, params={'username': username, 'balance': balance})
-    return res.json()
+    params = {'username': username, 'balance': balance}
+    return mimo_obj._get(url, params=params)
 
 
 def send_sms(**payload):
     """Send text messages via MIMO.
 
+    Return the message stored, or None when MIMO did not send it: the
+    send was refused, or every account is out of credit or throttled.
+    Raise ValueError, before sending, when a phone cannot be stored.
+
     :param sender: An sender by MIMO or None
     :param text: Text as a body of message
     :param recipients: list of phone's numbers
     """
-    res = mimo_sms_obj.send(**payload)
+    try:
+        account, res = router.send(**payload)
+    except (MimoOutOfCredit, MimoThrottled):
+        return None
+    return save_message(res, account)
+
+
+def save_message(res: dict, account: str = ''):
+    """Store the message and recipients of a MIMO send response.
+
+    :param res: response of MimoMessage.send
+    :param account: name of the MIMO account that sent the message
+    """
     if 'sender' in res.keys():
-        message_obj = Message.objects.create(
-            sender=res.get('sender'),
-            text=res.get('text'),
-            size=res.get('size'),
-            unicode=res.get('unicode')
-        )
-        list_items = []
-        items = res.get('recipients')
-        for item in items:
-            item.update(message=message_obj)
-            recipient_obj = Recipient(**item)
-            list_items.append(recipient_obj)
-        Recipient.objects.bulk_create(list_items)
+        with transaction.atomic():
+            message_obj = Message.objects.create(
+                sender=Sender.objects.filter(
+                    sender=res.get('sender')).first(),
+                text=res.get('text'),
+                size=res.get('size'),
+                unicode=res.get('unicode'),
+                account=account
+            )
+            counts = persist_recipients(
+                message_obj, res.get('recipients') or [])
+            message_obj.set_counters(counts)
         return message_obj
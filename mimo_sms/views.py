@@ -0,0 +1,114 @@
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from mimo_sms.codec import get_codec
+from mimo_sms.forms import SendJobForm
+from mimo_sms.utils import router, save_message
+
+codec = get_codec(getattr(settings, 'MIMO_JSON_CODEC', None))
+
+
+def _authorized(request) -> bool:
+    keys = getattr(settings, 'MIMO_SMS_API_KEYS', [])
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not key:
+        return False
+    return any(hmac.compare_digest(key, api_key) for api_key in keys)
+
+
+def _parse_jobs(stream):
+    """Yield `(line, job, errors)` for every NDJSON line of the stream."""
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = codec.loads(line)
+        except ValueError:
+            yield number, None, {'__all__': ['Invalid JSON.']}
+            continue
+        if not isinstance(data, dict):
+            yield number, None, {'__all__': ['Expected a JSON object.']}
+            continue
+        form = SendJobForm(data)
+        if form.is_valid():
+            yield number, form.cleaned_data, None
+        else:
+            yield number, None, form.errors.get_json_data()
+
+
+def _dispatch(job):
+    try:
+        return router.send(**job), None
+    except Exception as e:
+        return (None, None), str(e)
+
+
+def _save(account, res):
+    """
+    Store a send response as `(message, error)`, without raising so that
+    one line cannot cut the stream short.
+    """
+    if not res:
+        return None, None
+    if not isinstance(res, dict):
+        return None, f'Unexpected MIMO response: {res!r}'
+    try:
+        return save_message(res, account), None
+    except Exception as e:
+        return None, f'Sent but not saved: {e}'
+
+
+def _bulk_send_results(stream, batch_size: int, workers: int):
+    jobs = _parse_jobs(stream)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(jobs, batch_size))
+            if not batch:
+                break
+            chunk = []
+            valid = [(number, job) for number, job, _ in batch if job]
+            responses = dict(zip(
+                (number for number, _ in valid),
+                executor.map(_dispatch, (job for _, job in valid))))
+            for number, job, errors in batch:
+                if errors is not None:
+                    result = {
+                        'line': number, 'status': 'invalid', 'errors': errors}
+                else:
+                    (account, res), error = responses[number]
+                    if error is None:
+                        message_obj, error = _save(account, res)
+                    else:
+                        message_obj = None
+                    if message_obj is not None:
+                        result = {
+                            'line': number, 'status': 'sent',
+                            'message': message_obj.pk}
+                    else:
+                        result = {
+                            'line': number, 'status': 'failed',
+                            'error': error or res}
+                chunk.append(codec.dumps(result) + b'\n')
+            yield b''.join(chunk)
+
+
+@csrf_exempt
+@require_POST
+def bulk_send(request):
+    """
+    Send the jobs of an NDJSON body, one `{"sender", "text", "recipients"}`
+    object per line, and stream back one result per line.
+    """
+    if not _authorized(request):
+        return JsonResponse({'error': 'Invalid API key.'}, status=401)
+    batch_size = getattr(settings, 'MIMO_BULK_SEND_BATCH_SIZE', 100)
+    workers = getattr(settings, 'MIMO_BULK_SEND_WORKERS', 8)
+    return StreamingHttpResponse(
+        _bulk_send_results(request, batch_size, workers),
+        content_type='application/x-ndjson')